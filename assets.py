@@ -0,0 +1,92 @@
+# 图片资源：牌的图片第一次启动时并行解码、缩放，拼成一张图集缓存到磁盘，
+# 之后启动只需加载这一张图集；背景图用到时才加载
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from tiles import TILES
+
+CACHE_DIR = '.cache'
+BACK_KEY = 'back'
+BACK_IMAGE = 'pics/tileBack.png'
+ATLAS_COLUMNS = 13
+
+
+def _convert(surface):
+    # 有窗口时转换成屏幕的像素格式，之后 blit 更快
+    if pygame.display.get_surface() is not None:
+        return surface.convert_alpha()
+    return surface
+
+
+class AssetManager():
+    def __init__(self, card_width, card_height, cache_dir=CACHE_DIR, workers=8):
+        self.card_width = card_width
+        self.card_height = card_height
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.images = {}  # (路径, 尺寸) -> 已加载的图像
+
+    def tile_sources(self):
+        # 图集里的顺序：77张牌按编号排列，最后是牌背
+        return [(tile.image_key, tile.image_key) for tile in TILES] + [(BACK_KEY, BACK_IMAGE)]
+
+    def atlas_path(self):
+        return os.path.join(self.cache_dir, f'atlas_{self.card_width}x{self.card_height}.png')
+
+    def atlas_is_fresh(self, path):
+        if not os.path.exists(path):
+            return False
+        built = os.path.getmtime(path)
+        return all(os.path.getmtime(source) <= built for _, source in self.tile_sources())
+
+    def load_tiles(self):
+        # 返回 image_key -> 缩放好的牌图像（包括 'back' 牌背）
+        sources = self.tile_sources()
+        path = self.atlas_path()
+        if self.atlas_is_fresh(path):
+            atlas = _convert(pygame.image.load(path))
+        else:
+            atlas = self.build_atlas(path, [source for _, source in sources])
+        images = {}
+        for i, (key, _) in enumerate(sources):
+            images[key] = atlas.subsurface(self._atlas_rect(i))
+        return images
+
+    def build_atlas(self, path, sources):
+        size = (self.card_width, self.card_height)
+
+        def decode(source):
+            return pygame.transform.scale(pygame.image.load(source), size)
+
+        # pygame 解码图片时会释放 GIL，可以用线程并行
+        with ThreadPoolExecutor(self.workers) as pool:
+            scaled = list(pool.map(decode, sources))
+
+        rows = (len(sources) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+        atlas = pygame.Surface((ATLAS_COLUMNS * self.card_width, rows * self.card_height), pygame.SRCALPHA)
+        for i, image in enumerate(scaled):
+            atlas.blit(image, self._atlas_rect(i))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pygame.image.save(atlas, path)
+        except (OSError, pygame.error):
+            pass  # 缓存写不进去也不影响这次运行
+        return _convert(atlas)
+
+    def _atlas_rect(self, i):
+        row, col = divmod(i, ATLAS_COLUMNS)
+        return pygame.Rect(col * self.card_width, row * self.card_height, self.card_width, self.card_height)
+
+    def image(self, path, size=None):
+        # 背景等大图第一次用到时才加载，之后直接用缓存
+        key = (path, size)
+        image = self.images.get(key)
+        if image is None:
+            image = pygame.image.load(path)
+            if size is not None:
+                image = pygame.transform.scale(image, size)
+            image = self.images[key] = _convert(image)
+        return image
@@ -0,0 +1,248 @@
+# 性能基准：固定种子的固定工作量，结果写成 JSON，并和保存的基准结果比较
+#
+# 用法:
+#   python benchmark.py --save-baseline            跑一遍并保存为基准 bench_baseline.json
+#   python benchmark.py                            再跑一遍，比基准慢超过 10% 的项目返回非零退出码
+#   python benchmark.py --only rows,movegen --games 1000
+#
+# 每个项目记录总耗时、操作次数和每次操作的微秒数，比较时用每次操作的耗时；
+# check 是工作量的校验值（如自对弈的总回合数），和基准不同说明工作量变了，比较没有意义。
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import rules
+from board import Board
+from engine import RummikubEngine
+from movegen import generate_moves
+from robot import GreedyRobot
+from tiles import COLORS, TILES, get_tile
+
+BASELINE = 'bench_baseline.json'
+OUTPUT = 'bench_output.json'
+THRESHOLD = 0.10  # 比基准慢超过 10% 算退步
+SEED = 20240101
+
+
+def _timed(workload, repeat):
+    # 跑 repeat 次取最快的一次，减少机器负载的干扰
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops, check = workload()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return {'seconds': best, 'ops': ops, 'us_per_op': best / ops * 1e6, 'check': check}
+
+
+def worst_case_rows(count=2000):
+    # 12张牌的一行：几组顺子拼起来，然后把最后一张换掉，partition_row 要把所有切分方式试完才能确定无效；
+    # 再加上有鬼牌的随机行
+    rng = random.Random(SEED)
+    rows = []
+    while len(rows) < count:
+        color = rng.choice(COLORS)
+        start = rng.choice((1, 2))
+        row = [get_tile(color, value) for value in range(start, start + 2 * 12, 2) if value <= 15]
+        other = rng.choice([c for c in COLORS if c != color])
+        row += [get_tile(other, value) for value in range(start, start + 2 * (12 - len(row)), 2)]
+        rows.append(row)
+        rows.append(row[:-1] + [get_tile(other, row[-1].value + 1)])  # 奇偶不对，整行无效
+        rows.append(rng.sample(TILES, 12))
+    return rows[:count]
+
+
+def bench_rows(repeat):
+    rows = worst_case_rows()
+
+    def workload():
+        valid = 0
+        for row in rows:
+            melds, _ = rules.partition_row(row)
+            if melds is not None:
+                valid += 1
+            rules.is_valid_combination(row[:3])
+        return len(rows), valid
+    return _timed(workload, repeat)
+
+
+def bench_board(repeat, boards=200):
+    # 把 60 个牌槽全部放满，然后每张牌拿走再放回，每次都要增量更新所在的段
+    rng = random.Random(SEED)
+    layouts = [rng.sample(TILES, 60) for _ in range(boards)]
+
+    def workload():
+        ops = 0
+        invalid = 0
+        board = Board()
+        for tiles in layouts:
+            board.clear()
+            for slot, tile in enumerate(tiles):
+                board.place(tile, slot)
+            for slot, tile in enumerate(tiles):
+                board.remove(tile)
+                board.place(tile, slot)
+            invalid += len(board.invalid)
+            ops += 3 * len(tiles)
+        return ops, invalid
+    return _timed(workload, repeat)
+
+
+def movegen_positions(count=200, hand_size=24, turns=20):
+    # 自对弈一段时间得到真实的桌面，再从剩下的牌里抽一整手牌
+    positions = []
+    robot = GreedyRobot()
+    for seed in range(SEED, SEED + count):
+        game = RummikubEngine(seed=seed)
+        game.start_game()
+        for _ in range(turns):
+            robot.play_turn(game)
+        on_board = set(card for meld in game.board for card in meld)
+        rest = [card for card in TILES if card not in on_board]
+        hand = random.Random(seed).sample(rest, min(hand_size, len(rest)))
+        positions.append((hand, [list(meld) for meld in game.board]))
+    return positions
+
+
+def bench_movegen(repeat):
+    positions = movegen_positions()
+
+    def workload():
+        moves = 0
+        for hand, board in positions:
+            moves += sum(1 for _ in generate_moves(hand, board))
+        return len(positions), moves
+    return _timed(workload, repeat)
+
+
+def bench_selfplay(repeat, games=10000, workers=1):
+    import selfplay
+
+    def workload():
+        report = selfplay.run(games, ['greedy'] * 4, SEED, workers=workers)
+        return games, round(report['avg_turns'] * games)
+    return _timed(workload, repeat)
+
+
+def bench_render(repeat, frames=2000):
+    # 不开窗口（SDL dummy 驱动），模拟拖动一张牌时的主循环：每帧这张牌移动一点，每秒计时器变一次
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from render import Renderer
+
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 1000))
+    static_layer = pygame.Surface(screen.get_size())
+    static_layer.fill((0, 100, 0))
+    card = pygame.Surface((70, 90), pygame.SRCALPHA)
+    card.fill((240, 240, 220, 255))
+    back = pygame.Surface((70, 90), pygame.SRCALPHA)
+    back.fill((40, 40, 160, 255))
+    font = pygame.font.Font(None, 36)
+
+    scene = [(card, (200 + col * 70, 100 + row * 90)) for row in range(5) for col in range(12)]
+    scene += [(back, (0, y)) for y in range(0, 900, 95)]
+    scene += [(back, (1150, y)) for y in range(0, 900, 95)]
+    scene += [(back, (x, 30)) for x in range(50, 1150, 75)]
+    scene += [(card, (x, 750)) for x in range(50, 1150, 75)]
+
+    def workload():
+        renderer = Renderer(screen, static_layer)
+        updates = 0
+        for frame in range(frames):
+            dragged = (card, (300 + frame % 600, 400 + frame % 200))
+            timer = renderer.render_text(font, f'Time: {60 - frame // 30 % 60}', (255, 255, 255))
+            updates += renderer.draw(scene + [dragged, (timer, (1010, 560))])
+        return frames, updates
+    try:
+        return _timed(workload, repeat)
+    finally:
+        pygame.quit()
+
+
+BENCHMARKS = {
+    'rows': bench_rows,
+    'board': bench_board,
+    'movegen': bench_movegen,
+    'selfplay': bench_selfplay,
+    'render': bench_render,
+}
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # 返回比基准慢超过 threshold 的项目名
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:10} {result['us_per_op']:12.2f} us/op   (no baseline)")
+            continue
+        if base['ops'] != result['ops'] or base['check'] != result['check']:
+            print(f"{name:10} {result['us_per_op']:12.2f} us/op   (workload changed, not compared)")
+            continue
+        ratio = result['us_per_op'] / base['us_per_op']
+        status = 'REGRESSION' if ratio > 1 + threshold else 'ok'
+        print(f"{name:10} {result['us_per_op']:12.2f} us/op   baseline {base['us_per_op']:12.2f}   "
+              f"{(ratio - 1) * 100:+6.1f}%  {status}")
+        if status != 'ok':
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the fixed benchmark workloads.")
+    parser.add_argument('--only', help="comma separated benchmarks: " + ','.join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5, help="runs per benchmark, the fastest is kept")
+    parser.add_argument('--games', type=int, default=10000, help="self-play games (run once, not repeated)")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="self-play worker processes")
+    parser.add_argument('-o', '--output', default=OUTPUT)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"Unknown benchmark: {name}")
+
+    results = {}
+    for name in names:
+        if name == 'selfplay':
+            results[name] = bench_selfplay(1, args.games, args.workers)
+        else:
+            results[name] = BENCHMARKS[name](args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# 桌面模型：记录 5x12 牌槽里放了哪些牌，并增量维护每组牌是否有效，不依赖 pygame
+#
+# 同一行里连续放着的牌（中间没有空槽）算作一段，每段用 rules.partition_row 切分成牌组。
+# 放牌、拿走或移动一张牌时只重新检查受影响的那一两段，所以“整个桌面是否有效”随时可以直接读出。
+
+import rules
+
+BOARD_ROWS = 5
+BOARD_COLS = 12
+
+
+class Board():
+    def __init__(self, rows=BOARD_ROWS, cols=BOARD_COLS):
+        self.rows = rows
+        self.cols = cols
+        self.slots = [None] * (rows * cols)  # 牌槽序号 -> 牌
+        self.where = {}  # 牌的编号 -> 牌槽序号
+        self.segment_end = {}  # 段的起始槽 -> 结束槽（不含）
+        self.segment_melds = {}  # 段的起始槽 -> 切分出的牌组，无效时为 None
+        self.invalid = set()  # 无效段的起始槽
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, tile):
+        return tile.id in self.where
+
+    def tile_at(self, slot):
+        return self.slots[slot]
+
+    def slot_of(self, tile):
+        return self.where.get(tile.id)
+
+    def place(self, tile, slot):
+        # 把牌放进空槽（牌已经在桌面上时就是移动），槽被别的牌占着时返回 False
+        occupant = self.slots[slot]
+        if occupant is not None:
+            return occupant is tile
+        self.remove(tile)
+        self.slots[slot] = tile
+        self.where[tile.id] = slot
+        self._update_around(slot)
+        return True
+
+    def remove(self, tile):
+        slot = self.where.pop(tile.id, None)
+        if slot is None:
+            return False
+        self.slots[slot] = None
+        self._update_around(slot)
+        return True
+
+    def clear(self):
+        self.__init__(self.rows, self.cols)
+
+    def _update_around(self, slot):
+        # 只有这个槽左右相连的段会变化：先去掉旧的段，再重新计算
+        row_start = slot - slot % self.cols
+        row_end = row_start + self.cols
+        start = slot
+        while start > row_start and self.slots[start - 1] is not None:
+            start -= 1
+        end = slot + 1
+        while end < row_end and self.slots[end] is not None:
+            end += 1
+        for old in [s for s in range(start, end) if s in self.segment_end]:
+            self._drop_segment(old)
+
+        if self.slots[slot] is not None:
+            self._add_segment(start, end)
+        else:
+            if start < slot:
+                self._add_segment(start, slot)
+            if slot + 1 < end:
+                self._add_segment(slot + 1, end)
+
+    def _drop_segment(self, start):
+        del self.segment_end[start]
+        del self.segment_melds[start]
+        self.invalid.discard(start)
+
+    def _add_segment(self, start, end):
+        melds, _ = rules.partition_row(self.slots[start:end])
+        self.segment_end[start] = end
+        self.segment_melds[start] = melds
+        if melds is None:
+            self.invalid.add(start)
+
+    def is_valid(self):
+        return not self.invalid
+
+    def invalid_slots(self):
+        # 所有无效段里的牌槽，用于界面高亮
+        return [slot for start in self.invalid for slot in range(start, self.segment_end[start])]
+
+    def invalid_tiles(self):
+        return [self.slots[slot] for slot in sorted(self.invalid_slots())]
+
+    def melds(self):
+        # 按位置顺序返回所有有效的牌组（复制一份，调用方修改时不会影响缓存）
+        result = []
+        for start in sorted(self.segment_melds):
+            melds = self.segment_melds[start]
+            if melds is not None:
+                result.extend(list(meld) for meld in melds)
+        return result
+
+    def find_space(self, length, gap=1):
+        # 找一段能放下新牌组的空槽，左右各留 gap 个空槽，免得和旁边的牌连成一段；没有时返回 None。
+        # gap=0 时可以紧挨着别的牌组，连成的一段仍然能切分成有效的牌组
+        for row_start in range(0, len(self.slots), self.cols):
+            row = self.slots[row_start:row_start + self.cols]
+            for start in range(self.cols - length + 1):
+                if all(tile is None for tile in row[max(start - gap, 0):start + length + gap]):
+                    return row_start + start
+        return None
+
+    def tiles(self):
+        return [tile for tile in self.slots if tile is not None]
@@ -0,0 +1,111 @@
+# 本地测试客户端：开很多个连接代替真人玩家，连到 server.py 上自动出牌
+#
+# 用法: python client.py --tables 100 --seats 2
+
+import argparse
+import asyncio
+import json
+import time
+
+from engine import OPENING_POINTS
+from movegen import generate_moves
+from rules import meld_mask
+from tiles import TILES
+
+
+class BotClient():
+    # 只根据服务器发来的差异维护自己看到的状态，然后用出牌生成器找牌组
+    def __init__(self, table, seat=None):
+        self.table = table
+        self.seat = seat
+        self.hand = set()
+        self.state = {}
+        self.moves = 0
+        self.result = None
+
+    def apply(self, message):
+        self.hand.update(message.get('add', ()))
+        self.hand.difference_update(message.get('remove', ()))
+        for key in ('board', 'turn', 'counts', 'pouch', 'opened'):
+            if key in message:
+                self.state[key] = message[key]
+
+    def choose(self):
+        # 返回要发送的消息：新的整个桌面（每组牌一行），或者 pass
+        hand = [TILES[i] for i in sorted(self.hand)]
+        board = [[TILES[i] for i in meld] for meld in self.state.get('board', [])]
+        opened = self.state.get('opened', [False] * 4)[self.seat]
+        used = 0
+        played = 0
+        extended = set()
+        for move in generate_moves(hand, board if opened else ()):
+            mask = meld_mask(move.cards)
+            if mask & used or move.meld_index in extended:
+                continue  # 这些牌已经用掉了，或者这组牌已经加过牌
+            if move.meld_index is None:
+                board.append(list(move.cards))
+            else:
+                board[move.meld_index] = board[move.meld_index] + list(move.cards)
+                extended.add(move.meld_index)
+            used |= mask
+            played += sum(card.points for card in move.cards)
+        if not used or (not opened and played < OPENING_POINTS):
+            return {'op': 'pass'}
+        return {'op': 'play', 'rows': [[card.id for card in meld] for meld in board]}
+
+    async def run(self, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        join = {'op': 'join', 'table': self.table}
+        if self.seat is not None:
+            join['seat'] = self.seat
+        writer.write((json.dumps(join) + '\n').encode())
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            op = message['op']
+            if op == 'joined':
+                self.seat = message['seat']
+            elif op == 'diff':
+                self.apply(message)
+                if self.state.get('turn') == self.seat:
+                    writer.write((json.dumps(self.choose()) + '\n').encode())
+                    await writer.drain()
+                    self.moves += 1
+            elif op == 'error':
+                # 出牌被拒绝时改为摸牌
+                if self.state.get('turn') == self.seat:
+                    writer.write(b'{"op":"pass"}\n')
+                    await writer.drain()
+            elif op == 'over':
+                self.result = message
+                break
+        writer.close()
+
+
+async def run_clients(host, port, tables, seats):
+    clients = [BotClient(f'load-{t}', seat) for t in range(tables) for seat in range(seats)]
+    await asyncio.gather(*(client.run(host, port) for client in clients))
+    return clients
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play test clients against a running server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tables', type=int, default=10)
+    parser.add_argument('--seats', type=int, default=1, help="client seats per table, the rest are robots")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    clients = asyncio.run(run_clients(args.host, args.port, args.tables, args.seats))
+    elapsed = time.perf_counter() - start
+    finished = sum(1 for client in clients if client.result is not None)
+    moves = sum(client.moves for client in clients)
+    print(f"{finished}/{len(clients)} clients finished, {moves} moves in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
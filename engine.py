@@ -0,0 +1,260 @@
+# 纯规则引擎：不依赖 pygame、显示或 pics/ 目录，可在无界面环境下批量模拟
+
+import inspect
+import random
+from functools import wraps
+
+import rules
+from movegen import generate_moves
+from tiles import TILES
+
+HAND_SIZE = 10
+OPENING_POINTS = 30
+
+
+def create_deck(rng=random):
+    deck = list(TILES)
+    rng.shuffle(deck)
+    return deck
+
+
+class DrawPile():
+    # 公共牌堆：摸牌时随机选一张和最后一张交换再弹出，放回时直接加到末尾，
+    # 两个操作都是 O(1)，不需要每次重新洗整个牌堆
+    def __init__(self, tiles, rng):
+        self.tiles = tiles
+        self.rng = rng
+
+    def pop(self):
+        tiles = self.tiles
+        i = self.rng.randrange(len(tiles))
+        tiles[i], tiles[-1] = tiles[-1], tiles[i]
+        return tiles.pop()
+
+    def append(self, tile):
+        self.tiles.append(tile)
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def __iter__(self):
+        return iter(self.tiles)
+
+
+def logged(method):
+    # 把改变对局状态的调用写入 self.log，回放时按顺序重新调用即可；
+    # 方法内部再调用的其他方法（如 end_turn 里的摸牌）不重复记录
+    signature = inspect.signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if kwargs:
+            # 关键字参数换成按位置的参数，日志里只记录位置参数
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            args = bound.args[1:]
+        if self.log is None or self.logging:
+            return method(self, *args)
+        self.logging = True
+        try:
+            result = method(self, *args)
+        finally:
+            self.logging = False
+        self.log.record(method.__name__, args)  # 被拒绝的出牌回放时同样会被拒绝
+        return result
+    return wrapper
+
+
+class RummikubEngine():
+    def __init__(self, num_players=4, seed=None):
+        # 每局有自己的随机数生成器，同一个种子发出的牌和摸牌顺序完全相同
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.log = None  # 可选的 replay.MoveLog
+        self.logging = False
+        self.num_players = num_players
+        self.players = []
+        self.current_player = 0
+        self.round = 1
+        self.break_ice = [False] * num_players  # 每个玩家是否已完成30分破冰
+        self.public_pouch = DrawPile([], self.rng)
+        self.board = []  # 桌面上的牌组，每个元素是一组牌
+        self.turn_backup = None  # 本回合出牌前的桌面和手牌，破冰失败时撤回
+        self.passes = 0  # 连续没有出牌的回合数
+        self.winner = None
+        self.deck = create_deck(self.rng)  # 创建一个新的牌堆
+
+    @logged
+    def start_game(self):
+        for i in range(self.num_players):
+            self.players.append(self.deck[i * HAND_SIZE:(i + 1) * HAND_SIZE])  # 为每个玩家分配十张牌
+
+        # 初始化公共牌堆，牌堆为剩余的牌，牌组已经洗过不需要再洗
+        self.public_pouch = DrawPile(self.deck[self.num_players * HAND_SIZE:], self.rng)
+
+    def is_valid_combination(self, cards):
+        return rules.is_valid_combination(cards)
+
+    def is_row_valid(self, cards, start_index=0):
+        return rules.is_row_valid(cards[start_index:])
+
+    def partition_row(self, cards):
+        return rules.partition_row(cards)
+
+    @logged
+    def draw_tile(self, player_index=None):
+        if player_index is None:
+            player_index = self.current_player
+        if not self.public_pouch:
+            return None
+        tile = self.public_pouch.pop()
+        self.players[player_index].append(tile)
+        return tile
+
+    @logged
+    def draw_two_tiles(self):
+        if len(self.public_pouch) >= 2:
+            return [self.public_pouch.pop(), self.public_pouch.pop()]
+        elif len(self.public_pouch) == 1:
+            return [self.public_pouch.pop(), None]
+        return [None, None]
+
+    @logged
+    def return_tile(self, tile):
+        # 把没选中的牌放回牌堆，摸牌本身是随机的所以不用重新洗牌
+        self.public_pouch.append(tile)
+
+    @logged
+    def play_meld(self, cards):
+        # 从当前玩家手牌中打出一组新牌
+        hand = self.players[self.current_player]
+        if not self.is_valid_combination(cards) or any(card not in hand for card in cards):
+            return False
+        self.begin_change()
+        for card in cards:
+            hand.remove(card)
+        self.board.append(list(cards))
+        return True
+
+    @logged
+    def extend_meld(self, meld_index, cards):
+        # 往桌面已有的牌组中加牌，需要先破冰
+        hand = self.players[self.current_player]
+        if not self.break_ice[self.current_player]:
+            return False
+        if any(card not in hand for card in cards):
+            return False
+        meld = self.board[meld_index]
+        if not self.is_valid_combination(meld + list(cards)):
+            return False
+        self.begin_change()
+        for card in cards:
+            hand.remove(card)
+        meld.extend(cards)
+        return True
+
+    @logged
+    def rearrange(self, melds):
+        # 用新的牌组整体替换桌面：桌面原有的牌必须都还在，新增的牌必须来自手牌。
+        # 没破冰之前不能动桌面原有的牌组，只能另外加新牌组。
+        hand = self.players[self.current_player]
+        if not all(self.is_valid_combination(meld) for meld in melds):
+            return False
+        old_tiles = {card for meld in self.board for card in meld}
+        new_tiles = [card for meld in melds for card in meld]
+        if len(set(new_tiles)) != len(new_tiles) or not old_tiles <= set(new_tiles):
+            return False
+        played = [card for card in new_tiles if card not in old_tiles]
+        if any(card not in hand for card in played):
+            return False
+        if not played and self.turn_backup is None:
+            # 这回合一张牌都没出过时，原样交回桌面不算出牌，否则 end_turn 不会摸牌
+            return False
+        if not self.break_ice[self.current_player]:
+            kept = {frozenset(meld) for meld in melds}
+            if any(frozenset(meld) not in kept for meld in self.board):
+                return False
+        self.begin_change()
+        for card in played:
+            hand.remove(card)
+        self.board = [list(meld) for meld in melds]
+        return True
+
+    def legal_moves(self):
+        # 没破冰之前只能用手牌打出新牌组
+        board = self.board if self.break_ice[self.current_player] else ()
+        return generate_moves(self.players[self.current_player], board)
+
+    def apply_move(self, move):
+        if move.meld_index is None:
+            return self.play_meld(move.cards)
+        return self.extend_meld(move.meld_index, move.cards)
+
+    def begin_change(self):
+        # 本回合第一次改动前记下桌面和手牌
+        if self.turn_backup is None:
+            self.turn_backup = ([list(meld) for meld in self.board], list(self.players[self.current_player]))
+
+    @logged
+    def undo_turn(self):
+        # 撤回本回合的所有出牌
+        if self.turn_backup is not None:
+            self.board, self.players[self.current_player] = self.turn_backup
+            self.turn_backup = None
+
+    def turn_points(self):
+        if self.turn_backup is None:
+            return 0
+        return sum(card.points for card in self.turn_backup[1]) - self.hand_points(self.current_player)
+
+    @logged
+    def end_turn(self):
+        # 结束当前回合：检查破冰，没出牌则摸一张，然后轮到下一个玩家
+        player = self.current_player
+        opened = True
+        if self.turn_backup is not None and not self.break_ice[player]:
+            if self.turn_points() >= OPENING_POINTS:
+                self.break_ice[player] = True
+            else:
+                self.undo_turn()
+                opened = False
+
+        if self.turn_backup is not None:
+            self.passes = 0
+        else:
+            if self.draw_tile(player) is None:
+                self.passes += 1
+            else:
+                self.passes = 0
+        self.turn_backup = None
+
+        if not self.players[player]:
+            self.winner = player
+
+        self.current_player = (player + 1) % self.num_players
+        if self.current_player == 0:
+            self.round += 1
+        return opened
+
+    def is_over(self):
+        # 有人出完牌，或者牌堆已空且一整轮都没人能出牌
+        return self.winner is not None or self.passes >= self.num_players
+
+    def hand_points(self, player_index):
+        return sum(card.points for card in self.players[player_index])
+
+    def final_winner(self):
+        # 有人出完牌时就是他；牌局卡住时是剩余手牌分数最少的玩家
+        if self.winner is not None:
+            return self.winner
+        return min(range(self.num_players), key=self.hand_points)
+
+    def scores(self):
+        # 结算：其他玩家扣除剩余手牌分数，赢家得到所有扣分之和
+        penalties = [self.hand_points(i) for i in range(self.num_players)]
+        winner = self.final_winner()
+        result = [-p for p in penalties]
+        result[winner] = sum(penalties) - penalties[winner]
+        return result
@@ -0,0 +1,99 @@
+# 批量手牌评估：把 B 手牌存成 (B, 5 种颜色, 15 个点数) 的计数张量，用 numpy 一次算完
+# 手牌分数、能否破冰、可组成的同点组和同奇偶顺子数量，不需要逐张牌循环
+#
+# 用法:
+#   batch = HandBatch.from_hands([game.players[i] for i in range(game.num_players)])
+#   result = batch.evaluate()
+#   result['points'], result['may_open'], result['groups'], result['runs']
+
+import numpy as np
+
+from engine import OPENING_POINTS
+from rules import MAX_GROUP_SIZE, MIN_MELD_SIZE
+from tiles import COLORS, JOKER_IDS, NUM_TILES, VALUES
+
+NUM_COLORS = len(COLORS)
+NUM_VALUES = len(VALUES)
+NUM_PLAIN = NUM_COLORS * NUM_VALUES  # 不算鬼牌的牌数，编号 0..74
+RUN_STEP = 2  # 顺子是同颜色、同奇偶、每次加2
+RUN_SPAN = RUN_STEP * (MIN_MELD_SIZE - 1)
+
+# 每个点数的分数：1-9 按点数，10-15 都算 10 分
+POINTS = np.minimum(np.arange(1, NUM_VALUES + 1), 10)
+
+
+class HandBatch():
+    def __init__(self, counts, jokers):
+        self.counts = counts  # (B, 5, 15) 每种牌的张数
+        self.jokers = jokers  # (B,) 鬼牌张数
+
+    def __len__(self):
+        return len(self.counts)
+
+    @staticmethod
+    def from_hands(hands):
+        # hands 是 B 个手牌列表；用 bincount 一次统计所有牌，不逐手牌循环
+        sizes = [len(hand) for hand in hands]
+        ids = np.fromiter((card.id for hand in hands for card in hand), dtype=np.int64, count=sum(sizes))
+        rows = np.repeat(np.arange(len(hands)), sizes)
+        flat = np.bincount(rows * NUM_TILES + ids, minlength=len(hands) * NUM_TILES)
+        flat = flat.reshape(len(hands), NUM_TILES).astype(np.int16)
+        counts = flat[:, :NUM_PLAIN].reshape(-1, NUM_COLORS, NUM_VALUES)
+        jokers = flat[:, list(JOKER_IDS)].sum(axis=1)
+        return HandBatch(counts, jokers)
+
+    @staticmethod
+    def from_games(games):
+        # 把多局对局里所有玩家的手牌放进同一批，第 g 局第 p 个玩家在 g * num_players + p
+        return HandBatch.from_hands([hand for game in games for hand in game.players])
+
+    def points(self):
+        # 剩余手牌分数（鬼牌不计分）
+        return (self.counts * POINTS).sum(axis=(1, 2))
+
+    def evaluate(self):
+        counts = self.counts
+        jokers = self.jokers[:, None]
+        present = counts > 0
+
+        # 同点组：这个点数有几种颜色，加上鬼牌能凑够3张就可以组成
+        colors = present.sum(axis=1)  # (B, 15)
+        group_ok = (colors >= 1) & (colors + jokers >= MIN_MELD_SIZE)
+        groups = group_ok.sum(axis=1)
+        # 不用鬼牌时能组成的不同同点组个数：C(n,3) + C(n,4) + C(n,5)
+        pure_groups = _combinations(colors, MIN_MELD_SIZE, MAX_GROUP_SIZE).sum(axis=1)
+
+        # 同奇偶顺子：每个长度为3的窗口 v, v+2, v+4，缺的牌不超过鬼牌数就可以组成
+        window = (present[:, :, :-RUN_SPAN].astype(np.int16)
+                  + present[:, :, RUN_STEP:-RUN_STEP] + present[:, :, RUN_SPAN:])  # (B, 5, 11)
+        run_ok = (window >= 1) & (window + jokers[:, :, None] >= MIN_MELD_SIZE)
+        runs = run_ok.sum(axis=(1, 2))
+        pure_runs = (window == MIN_MELD_SIZE).sum(axis=(1, 2))
+
+        # 至少能放进一个组或顺子的牌，它们的分数之和是破冰能打出的分数上限
+        covered = np.broadcast_to(group_ok[:, None, :], present.shape).copy()
+        covered[:, :, :-RUN_SPAN] |= run_ok
+        covered[:, :, RUN_STEP:-RUN_STEP] |= run_ok
+        covered[:, :, RUN_SPAN:] |= run_ok
+        meldable_points = (counts * covered * POINTS).sum(axis=(1, 2))
+
+        return {
+            'points': self.points(),
+            'meldable_points': meldable_points,
+            'may_open': meldable_points >= OPENING_POINTS,  # 必要条件，确切能否破冰要搜索
+            'groups': groups,
+            'pure_groups': pure_groups,
+            'runs': runs,
+            'pure_runs': pure_runs,
+        }
+
+
+def _combinations(n, low, high):
+    # 从 n 个里选 low..high 个的组合数之和，n 是数组
+    total = np.zeros_like(n)
+    for k in range(low, high + 1):
+        term = np.ones_like(n)
+        for i in range(k):
+            term = term * (n - i) // (i + 1)
+        total += np.where(n >= k, term, 0)
+    return total
@@ -1,253 +1,159 @@
 import pygame
 import os
-import random
-from itertools import groupby
+import sys
+
+from assets import AssetManager
+from board import Board
+from engine import RummikubEngine
+from render import FPS, Renderer
+from robot import SearchRobot
+from solver import hint
+from spatial import GridIndex, slot_index
+from telemetry import DEBUG, INFO, Telemetry
+from tiles import NUM_TILES, TILES
 
 class Card():
-    loaded_images = {}  # 类变量，用于存储加载的图像
-
-    def __init__(self):
-        self.color = None
-        self.value = None
-        self.points = 0
-        self.colorDict = {1: "1", 2: "2", 3: "3", 4: "4", 5: "5"}
-        self.valueDict = {10: "0a", 11: "0b", 12: "0c", 13: "0d", 14: '0e', 15: '0f'}
-        self.x = 0
-        self.y = 0
+    loaded_images = {}  # 类变量，按牌的 image_key 存储加载的图像
 
     @staticmethod
-    def load_images(card_display_width, card_display_height):
-        for color in range(1, 6):
-            for value in range(1, 16):
-                card = Card()
-                card.createSpecificCard(color, value)
-                image = pygame.image.load(card.filename())
-                scaled_image = pygame.transform.scale(image, (card_display_width, card_display_height))
-                Card.loaded_images[card.filename()] = scaled_image
-
-        # 加载鬼牌的图像
-        for joker_color in ['black', 'red']:
-            joker_image = pygame.image.load(f'pics/{joker_color}.png')
-            scaled_joker_image = pygame.transform.scale(joker_image, (card_display_width, card_display_height))
-            Card.loaded_images[f'pics/{joker_color}.png'] = scaled_joker_image
-
-        # 加载牌背的图像
-        back_image = pygame.image.load('pics/tileBack.png')
-        Card.loaded_images['back'] = pygame.transform.scale(back_image, (card_display_width, card_display_height))
-
-    def create_deck(self):
-        deck = []
-        for color in range(1, 6):  # 5种颜色的牌
-            for value in range(1, 16):  # 每种颜色15张牌
-                card = Card()
-                card.createSpecificCard(color, value)
-                deck.append(card)
-
-        # 添加两张鬼牌
-        black_joker = Card()
-        black_joker.create_joker('black')
-        deck.append(black_joker)
-
-        red_joker = Card()
-        red_joker.create_joker('red')
-        deck.append(red_joker)
-
-        random.shuffle(deck)
-        return deck
-
-    def createSpecificCard(self, s, v):
-        self.color = s
-        self.value = v
-        self.calculate_points()
-
-    def create_joker(self, color):
-        self.color = color
-        self.value = 0
-        self.points = 0
-
-
-    def calculate_points(self):
-        if 1 <= self.value <= 9:
-            self.points = self.value
-        else:   
-            self.points = 10
-
-    def filename(self):
-        # 首先检查是否为鬼牌
-        if self.color in ['black', 'red']:
-            return f'pics/{self.color}.png'
-
-        fn = "pics/"
-        fn += self.colorDict[self.color] + "-"
-        if 1 <= self.value <= 9:
-            fn += str(self.value).zfill(2)
-        else:
-            fn += self.valueDict[self.value]
-        fn += ".png"
-        return fn
-
-    def setPosition(self, x, y):
-        self.x = x
-        self.y = y
-
-    def get_scaled_image(self, target_width, target_height):
-        image = Card.loaded_images[self.filename()]
-        scaled_rect = image.get_rect().move(self.x, self.y)
-        return image, scaled_rect
-    def get_scaled_rect(self, target_width, target_height):
-        _, scaled_rect = self.get_scaled_image(target_width, target_height)
-        return scaled_rect
-
-class RummikubGame():
-    def __init__(self):
-        self.players = []
-        self.current_player = 0
-        self.round = 1
-        self.break_ice = False
-        self.public_pouch = []
+    def load_images(assets):
+        # 从缓存的图集中取出所有牌和牌背的图像，图集不存在时才逐张解码生成
+        Card.loaded_images = assets.load_tiles()
+
+class RummikubGame(RummikubEngine):
+    # 规则都在 engine.RummikubEngine 中，这里只保留和界面相关的部分
+    def __init__(self, seed=None):
+        super().__init__(seed=seed)
         self.card_display_width = 70
         self.card_display_height = 90
-        self.deck = Card().create_deck()  # 创建一个新的牌堆
-
-    def start_game(self):
-        for _ in range(4):  # 假设有四个玩家
-            player_hand = self.deck[:10]  # 为每个玩家分配前十张牌
-            self.deck = self.deck[10:]  # 从牌堆中移除已分配的牌
-            self.players.append(player_hand)
-
-        # 初始化公共牌堆
-        self.public_pouch = self.deck  # 公共牌堆为剩余的牌
-        random.shuffle(self.public_pouch)
-
-    def is_valid_combination(self, cards):
-        # 确保卡片列表非空且至少有三张卡片
-        if not cards or len(cards) < 3:
-            return False
-
-        # 检查是否所有卡片都是同一颜色
-        if all(card.color == cards[0].color for card in cards):
-            sorted_cards = sorted(cards, key=lambda x: x.value)
-            if all(card.value % 2 == sorted_cards[0].value % 2 for card in sorted_cards):
-                if all(sorted_cards[i].value == sorted_cards[i-1].value + 2 for i in range(1, len(sorted_cards))):
-                    return True
-
-        # 检查是否所有卡片数字相同但颜色不同
-        if all(card.value == cards[0].value for card in cards):
-            unique_colors = set(card.color for card in cards)
-            if len(unique_colors) == len(cards):
-                return True
+        self.positions = [(0, 0)] * NUM_TILES  # 按牌的编号保存屏幕位置
+        self.card_index = GridIndex(self.card_display_width, self.card_display_height)  # 可以拖动的牌
+        self.robot = SearchRobot(deadline_ms=500)  # 点击 Robot 按钮时使用的策略
+        self.telemetry = Telemetry.from_env()
+
+    def set_position(self, card, x, y):
+        self.positions[card.id] = (x, y)
+        if card.id in self.card_index:
+            self.card_index.insert(card.id, (x, y, self.card_display_width, self.card_display_height))
+
+    def track_card(self, card):
+        self.card_index.insert(card.id, self.get_scaled_rect(card))
+
+    def untrack_card(self, card):
+        self.card_index.remove(card.id)
+
+    def card_at(self, point):
+        tile_id = self.card_index.top_at(point)
+        return None if tile_id is None else TILES[tile_id]
+
+    def show_current_hand(self, hand_area_slots, board_cards):
+        # 轮到新玩家时把他的手牌摆到下方手牌区，并重建可拖动牌的索引
+        self.card_index.clear()
+        for card in board_cards:
+            if card:
+                self.track_card(card)
+        for i, card in enumerate(self.players[self.current_player][:len(hand_area_slots)]):
+            self.set_position(card, hand_area_slots[i].x, hand_area_slots[i].y)
+            self.track_card(card)
+
+    def get_scaled_image(self, card):
+        image = Card.loaded_images[card.image_key]
+        scaled_rect = image.get_rect().move(self.positions[card.id])
+        return image, scaled_rect
 
-        return False
+    def get_scaled_rect(self, card):
+        rect = self.card_index.rects.get(card.id)
+        if rect is not None:
+            return rect
+        x, y = self.positions[card.id]
+        return pygame.Rect(x, y, self.card_display_width, self.card_display_height)
 
     def display_player_hand(self, screen, player_hand, hand_area_slots):
         for i, card in enumerate(player_hand):
             # 确定卡片位置
-            card.setPosition(hand_area_slots[i].x, hand_area_slots[i].y)
+            self.set_position(card, hand_area_slots[i].x, hand_area_slots[i].y)
             # 显示卡片
-            card_image, card_rect = card.get_scaled_image(self.card_display_width, self.card_display_height)
+            card_image, card_rect = self.get_scaled_image(card)
             screen.blit(card_image, card_rect)
 
 
-    def add_to_game_area(self, current_player_hand, cardList):
-        if self.is_valid_combination(cardList):
-            current_player_hand.clear()
-            return True
-        return False
-
-    def play_turn(self, screen, cardList):
-        current_player_hand = self.players[self.current_player]
-        if not self.break_ice:
-            total_points = sum(card.points for card in current_player_hand)
-            if total_points >= 30:
-                self.break_ice = True
-            else:
-                print("You need to show at least 30 points in the first round.")
-                pygame.quit()
-        else:
-            added_to_game = self.add_to_game_area(current_player_hand, cardList)
-            if not added_to_game:
-                build_successful = self.build_on_existing_sets(current_player_hand, cardList)
-                if not build_successful:
-                    drawn_tile_1 = self.draw_tile_from_pool()
-                    drawn_tile_2 = self.draw_tile_from_pool()
-                    chosen_tile = self.choose_tile_to_add(drawn_tile_1, drawn_tile_2)
-                    current_player_hand.append(chosen_tile)
-        screen.fill(pygame.Color('aquamarine4'))
-        for card in cardList:
-            card_image, card_rect = card.get_scaled_image(self.card_display_width, self.card_display_height)
-            screen.blit(card_image, card_rect)
-        pygame.display.update()
-
     def draw_two_tiles(self):
-        if len(self.public_pouch) >= 2:
-            tile1 = self.public_pouch.pop()
-            tile2 = self.public_pouch.pop()
-            tile1.setPosition(300, 200)  # 第一张牌的位置
-            tile2.setPosition(400, 200)  # 第二张牌的位置
-            return [tile1, tile2]
-        elif len(self.public_pouch) == 1:
-            tile = self.public_pouch.pop()
-            tile.setPosition(300, 200)  # 如果只剩一张牌，显示在这个位置
-            return [tile, None]
-        return [None, None]
-
-    def choose_tile_to_add(self, tile1, tile2):
-        return tile1
-
-    def build_on_existing_sets(self, current_player_hand, cardList):
-        if cardList:
-            cardList.extend(current_player_hand)
-            current_player_hand.clear()
-            return True
-        return False
+        tile1, tile2 = super().draw_two_tiles()
+        if tile1 is not None:
+            self.set_position(tile1, 300, 200)  # 第一张牌的位置
+        if tile2 is not None:
+            self.set_position(tile2, 400, 200)  # 第二张牌的位置
+        return [tile1, tile2]
+
+    def build_on_existing_sets(self):
+        # 用求解器在桌面已有的牌组上出牌，经过 rearrange 检查规则；一张也打不出时返回 False
+        melds = hint(self)
+        return melds is not None and self.rearrange(melds)
+
     def robot_turn(self, player_index):
-        
-        # 此处可根据游戏规则添加更复杂的策略
-        player_hand = self.players[player_index]
-        # 检查手牌中是否有有效的组合
-        for i in range(len(player_hand)):
-            for j in range(i + 1, len(player_hand)):
-                if self.is_valid_combination([player_hand[i], player_hand[j]]):
-                    # 出这些牌
-                    self.add_to_game_area(player_hand, [player_hand[i], player_hand[j]])
-                    return
-        #检查卡池中是否有有效组合
-        for i in range(len(self.placement_slots)):
-            for j in range(i + 1, len(self.placement_slots)):
-                if self.is_valid_combination([self.placement_slots[i], self.placement_slots[j]]):           
-                    self.add_to_game_area(player_hand, [self.placement_slots[i], self.placement_slots[j]])
-                    return
-        # 如果没有有效组合，随机抽一张牌
-        if self.public_pouch:
-            player_hand.append(self.public_pouch.pop())
-
-    def is_row_valid(self, cards, start_index):
-        if start_index >= len(cards):
-            return True  # 已经检查完所有卡牌
-
-        for end_index in range(start_index + 2, len(cards)):
-            if self.is_valid_combination(cards[start_index:end_index + 1]):
-                if self.is_row_valid(cards, end_index + 1):
-                    return True
-        return False
-
-
-def is_in_middle_area(card, placement_slots, card_display_width, card_display_height, cards):
-    card_rect = pygame.Rect(card.x, card.y, card_display_width, card_display_height)
-    for slot in placement_slots:
-        if slot.contains(card_rect):
-            print(f"Card in middle area: {card.filename()}, position: {card.x}, {card.y}")
-            return True, cards.index(card) if card in cards else None
-    return False, None
-
-
-
-
-def draw_start_screen(screen, font, title_font):
+        self.current_player = player_index
+        start = self.telemetry.clock()
+        self.robot.play_turn(self)
+        self.telemetry.add_time('robot', start)
+
+
+
+
+def take_back_hand_tiles(game, board, cards):
+    # 当前玩家放到牌槽里、还没交给引擎的手牌收回手牌区
+    hand = game.players[game.current_player]
+    for card in board.tiles():
+        if card in hand:
+            board.remove(card)
+            cards.remove(card)
+
+
+def place_engine_board(game, board, cards, placement_slots):
+    # 把引擎的桌面摆进牌槽：没有变化的牌组留在原处，新的或变化了的牌组另找空槽，
+    # 已经不在引擎桌面上的牌（例如被撤回）从牌槽里拿走
+    on_table = {card for meld in game.board for card in meld}
+    kept = {frozenset(meld) for meld in game.board}
+    for meld in board.melds():
+        if frozenset(meld) not in kept:
+            for card in meld:
+                board.remove(card)
+    for card in board.tiles():
+        if card not in on_table:
+            board.remove(card)
+            if card in cards:
+                cards.remove(card)
+    placed = {frozenset(meld) for meld in board.melds()}
+    missing = [meld for meld in game.board if frozenset(meld) not in placed]
+    if _place_melds(game, board, cards, placement_slots, missing):
+        return
+    # 空位不够时整个桌面从长到短重新摆一遍，还放不下就让牌组紧挨着
+    melds = sorted(game.board, key=len, reverse=True)
+    for gap in (1, 0):
+        board.clear()
+        if _place_melds(game, board, cards, placement_slots, melds, gap):
+            return
+    game.telemetry.log('board_full', tiles=len(on_table))
+
+
+def _place_melds(game, board, cards, placement_slots, melds, gap=1):
+    for meld in melds:
+        start = board.find_space(len(meld), gap)
+        if start is None:
+            return False
+        for i, card in enumerate(meld):
+            board.place(card, start + i)
+            slot = placement_slots[start + i]
+            game.set_position(card, slot.x, slot.y)
+            if card not in cards:
+                cards.append(card)
+    return True
+
+
+def draw_start_screen(screen, font, title_font, assets):
     white = (255, 255, 255)
     blue = (0, 0, 255)
 
-    background_image = pygame.image.load('pics/background.jpg')
+    background_image = assets.image('pics/background.jpg')
     screen.fill(white)
     screen.blit(background_image, (0, 50))
 
@@ -261,13 +167,14 @@ def draw_start_screen(screen, font, title_font):
     screen.blit(start_text, (start_button.x + 50, start_button.y + 15))
 
     return start_button
-def main():
+def main(fps=FPS):
     pygame.init()
     screen = pygame.display.set_mode((1200, 1000))
     pygame.display.set_caption("Rummikub Game")
 
     game = RummikubGame()
     game.start_game()
+    clock = pygame.time.Clock()
 
     font = pygame.font.Font(None, 36)
     title_font = pygame.font.Font(None, 150)
@@ -277,6 +184,10 @@ def main():
     timer_duration = 60000
     timer_rect = pygame.Rect(1000, 550, 110, 40)
 
+    telemetry = game.telemetry
+    stats_font = pygame.font.Font(None, 24)
+    show_stats = False  # F3 打开或关闭统计层
+
     show_button = pygame.Rect(1000, 600, 100, 40)
     show_text = font.render('Show', True, (255, 255, 255))
     show_cards = False
@@ -288,15 +199,17 @@ def main():
     robot_play_text = font.render('Robot', True, (255, 255, 255))
 
     card_display_width, card_display_height = 70, 90
-    Card.load_images(card_display_width, card_display_height)
+    assets = AssetManager(card_display_width, card_display_height)
+    Card.load_images(assets)
 
-    cardBackOriginal = pygame.image.load('pics/tileBack.png')
-    cardBack = pygame.transform.scale(cardBackOriginal, (card_display_width, card_display_height))
+    cardBack = Card.loaded_images['back']
     cardBackPos = (1100, 650)
     cardDeckRect = cardBack.get_rect(topleft=cardBackPos)
 
     cards = []
+    board = Board()  # 中间区域每个牌槽里的牌，随时知道哪些牌组无效
     choosing_tiles = False  # 初始化choosing_tiles变量
+    chosen_tile = None  # 摸到后选中、还没放进手牌的牌
 
     dragging = False
     selected_card = None
@@ -309,14 +222,12 @@ def main():
             slot = pygame.Rect(x, y, card_display_width, card_display_height)
             placement_slots.append(slot)
 
-    board_background_original = pygame.image.load('pics/board.png')
-    board_background = pygame.transform.scale(board_background_original, (card_display_width + 5, card_display_height))
-
     hand_area_slots = [pygame.Rect(x, y, card_display_width, card_display_height)
                        for y in [750, 800]
                        for x in range(50, 1150, card_display_width + 5)]
-    for i, card in enumerate(game.players[game.current_player]):
-        card.setPosition(hand_area_slots[i].x, hand_area_slots[i].y)
+    game.show_current_hand(hand_area_slots, cards)
+    placement_index = slot_index(placement_slots, card_display_width, card_display_height)
+    hand_slot_index = slot_index(hand_area_slots, card_display_width + 5, card_display_height)
 
     left_hand_area_slots = [pygame.Rect(0, y, card_display_width, card_display_height) 
                             for y in range(0, 900, card_display_height + 5)]
@@ -327,12 +238,9 @@ def main():
     top_hand_area_slots = [pygame.Rect(x, 30, card_display_width, card_display_height) 
                            for x in range(50, 1150, card_display_width + 5)]
 
-    main_background = pygame.image.load('pics/background2.png')
-    main_background = pygame.transform.scale(main_background, (1200, 1000))
-
     start_screen = True
     while start_screen:
-        start_button = draw_start_screen(screen, font, title_font)
+        start_button = draw_start_screen(screen, font, title_font, assets)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
@@ -342,182 +250,227 @@ def main():
                 if start_button.collidepoint((mx, my)):
                     start_screen = False
         pygame.display.flip()
+        clock.tick(fps)
+
+    # 不会变化的部分只画一次，缓存成静态图层；游戏背景在开始界面之后才加载
+    main_background = assets.image('pics/background2.png', (1200, 1000))
+    board_background = assets.image('pics/board.png', (card_display_width + 5, card_display_height))
+    static_layer = pygame.Surface(screen.get_size())
+    static_layer.blit(main_background, (0, 0))
+    for slot in hand_area_slots:
+        static_layer.blit(board_background, (slot.x, slot.y))
+    static_layer.blit(cardBack, cardBackPos)
+    for slot in placement_slots + hand_area_slots:
+        pygame.draw.rect(static_layer, (200, 200, 200), slot, 1)
+    for slot in left_hand_area_slots + right_hand_area_slots + top_hand_area_slots:
+        static_layer.blit(board_background, (slot.x, slot.y))
+    pygame.draw.rect(static_layer, (0, 128, 0), robot_play_button)
+    static_layer.blit(robot_play_text, (robot_play_button.x + 10, robot_play_button.y + 10))
+    pygame.draw.rect(static_layer, (0, 128, 0), done_button)
+    static_layer.blit(done_text, (1020, 710))
+    pygame.draw.rect(static_layer, (0, 128, 0), show_button)
+    static_layer.blit(show_text, (show_button.x + 10, show_button.y + 10))
+    static_layer.fill((0, 128, 0), timer_rect)
+    renderer = Renderer(screen, static_layer)
+    invalid_marker = pygame.Surface((card_display_width, card_display_height), pygame.SRCALPHA)
+    invalid_marker.fill((255, 0, 0, 80))
 
     running = True
     while running:
-        screen.blit(main_background, (0, 0))
-        need_update = False
-
-        current_time = pygame.time.get_ticks()
-        time_left = max(timer_duration - (current_time - timer_start), 0)
-        timer_text = timer_font.render(f'Time: {time_left // 1000}', True, (255, 255, 255))
-        screen.fill((0, 128, 0), timer_rect)
-        screen.blit(timer_text, (timer_rect.x + 10, timer_rect.y + 10))
-        pygame.display.update(timer_rect)
-
+        frame_start = telemetry.clock()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
 
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                # 窗口被遮挡或最小化后恢复，屏幕内容已经丢失，下一帧整屏重画
+                renderer.invalidate()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_stats = not show_stats
+                if show_stats and not telemetry.enabled():
+                    telemetry.level = INFO  # 统计层需要计数和耗时
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_h and not choosing_tiles:
+                # H：按求解器的提示出牌（不结束回合，还要按 Done）；这回合已经出过牌时撤回
+                take_back_hand_tiles(game, board, cards)
+                if game.turn_backup is not None:
+                    game.undo_turn()
+                elif not game.build_on_existing_sets():
+                    telemetry.log('no_hint', player=game.current_player)
+                place_engine_board(game, board, cards, placement_slots)
+                game.show_current_hand(hand_area_slots, cards)
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mx, my = pygame.mouse.get_pos()
                 if robot_play_button.collidepoint((mx, my)):
-                    robot_play_turn(game, game.current_player)
-                    game.current_player = (game.current_player + 1) % len(game.players)
+                    # 电脑从回合开始接手：这回合放到桌面上的手牌先收回，引擎的桌面按牌槽里的牌组重建
+                    take_back_hand_tiles(game, board, cards)
+                    if board.is_valid():
+                        game.board = board.melds()
+                    game.robot_turn(game.current_player)  # end_turn 会轮到下一个玩家
+                    place_engine_board(game, board, cards, placement_slots)
+                    game.show_current_hand(hand_area_slots, cards)
 
                 if cardDeckRect.collidepoint((mx, my)) and not choosing_tiles:
                     drawn_tiles = game.draw_two_tiles()
                     if drawn_tiles != [None, None]:
                         choosing_tiles = True
                         cards.extend(drawn_tiles)
+                        for tile in drawn_tiles:
+                            if tile:
+                                game.track_card(tile)
 
                 if choosing_tiles:
                     for tile in drawn_tiles:
-                        if tile and tile.get_scaled_rect(card_display_width, card_display_height).collidepoint((mx, my)):
+                        if tile and game.get_scaled_rect(tile).collidepoint((mx, my)):
                             chosen_tile = tile
                             unchosen_tile = drawn_tiles[0] if drawn_tiles[1] == chosen_tile else drawn_tiles[1]
                             if unchosen_tile is not None:
-                                game.public_pouch.append(unchosen_tile)
-                                random.shuffle(game.public_pouch)
+                                game.untrack_card(unchosen_tile)
+                                game.return_tile(unchosen_tile)
                             cards.remove(unchosen_tile)
                             drawn_tiles = []
                             choosing_tiles = False
 
                 if done_button.collidepoint((mx, my)):
-                    middle_area_cards = [card for card in cards if is_in_middle_area(card, placement_slots, card_display_width, card_display_height, cards)]
-                    middle_area_cards = [card for card in cards if is_in_middle_area(card, placement_slots, card_display_width, card_display_height, cards)]
-
-                    # 初始化valid_combinations变量
+                    # 桌面模型在放牌、拿牌时已经更新了每组牌的状态，这里直接读结果
+                    start = telemetry.clock()
                     valid_combinations = False
 
                     # 检查中间区域是否有卡牌
-                    if not middle_area_cards:
-                        print("Invalid combination. No cards in the middle area.")
+                    hand = game.players[game.current_player]
+                    if not len(board):
+                        telemetry.log('done_rejected', reason='empty board')
+                    elif not board.is_valid():
+                        telemetry.log('done_rejected', reason='invalid melds',
+                                      tiles=[card.id for card in board.invalid_tiles()])
+                    elif any(card in hand for card in board.tiles()) and not game.rearrange(board.melds()):
+                        # 引擎再检查一遍：新放的牌必须来自手牌，没破冰时不能动桌面原有的牌组
+                        telemetry.log('done_rejected', reason='illegal play')
                     else:
-                        rows = groupby(sorted(middle_area_cards, key=lambda c: (c.y, c.x)), key=lambda c: c.y)
                         valid_combinations = True
-
-                        for _, row_cards in rows:
-                            row_cards_sorted = sorted(row_cards, key=lambda c: c.x)
-                            if not game.is_row_valid(row_cards_sorted, 0):
-                                valid_combinations = False
-                                break
+                    telemetry.add_time('validate', start)
 
                     if valid_combinations:
-                        print("Valid combination!")
-                        game.current_player = (game.current_player + 1) % len(game.players)
-                    else:
-                        print("Invalid combination.")
+                        telemetry.log('done_accepted', player=game.current_player, tiles=len(board))
+                        if not game.end_turn():  # 破冰不够30分时引擎会撤回这回合的牌
+                            telemetry.log('opening_too_low', player=(game.current_player - 1) % game.num_players)
+                        place_engine_board(game, board, cards, placement_slots)
+                        game.show_current_hand(hand_area_slots, cards)
 
                 if show_button.collidepoint((mx, my)):
                     show_cards = not show_cards
 
-                current_player_hand = game.players[game.current_player]
-                all_cards = current_player_hand + cards
-                for card in all_cards:
-                    if card.get_scaled_rect(card_display_width, card_display_height).collidepoint((mx, my)):
-                        dragging = True
-                        selected_card = card
+                card = game.card_at((mx, my))
+                if card is not None:
+                    dragging = True
+                    selected_card = card
+                    drag_origin = game.positions[card.id]
 
             if event.type == pygame.MOUSEBUTTONUP:
                 dragging = False
                 if selected_card:
+                    start = telemetry.clock()
                     in_middle_area = False  
                     in_hand_area = False
 
                     # 检查是否在中心区域的slot中
-                    for slot in placement_slots:
-                        if slot.collidepoint((mx, my)):
-                            selected_card.setPosition(slot.x, slot.y)
-                            in_middle_area = True
+                    slot_number = placement_index.top_at((mx, my))
+                    if slot_number is not None:
+                        in_middle_area = True
+                        if board.place(selected_card, slot_number):
+                            slot = placement_slots[slot_number]
+                            game.set_position(selected_card, slot.x, slot.y)
                             if selected_card not in cards:
                                 cards.append(selected_card)
-                            break
+                        else:
+                            # 槽里已经有别的牌，放回拖动前的位置
+                            game.set_position(selected_card, *drag_origin)
 
                     # 检查是否在手牌区域的slot中
+                    hand = game.players[game.current_player]
+                    on_table = {card for meld in game.board for card in meld}
                     if not in_middle_area:
-                        for slot in hand_area_slots:
-                            if slot.collidepoint((mx, my)):
-                                selected_card.setPosition(slot.x, slot.y)
-                                in_hand_area = True
-                                if selected_card in cards:
-                                    cards.remove(selected_card)
-                                if selected_card not in game.players[game.current_player]:
-                                    game.players[game.current_player].append(selected_card)
-                                break
+                        slot_number = hand_slot_index.top_at((mx, my))
+                        if slot_number is not None and selected_card not in hand and selected_card is not chosen_tile:
+                            # 只有自己的手牌和刚摸到的牌能放回手牌区，桌面上已有的牌放回原处
+                            game.set_position(selected_card, *drag_origin)
+                            in_hand_area = True  # 已经处理，不再当作拖出界外
+                        elif slot_number is not None:
+                            slot = hand_area_slots[slot_number]
+                            game.set_position(selected_card, slot.x, slot.y)
+                            in_hand_area = True
+                            board.remove(selected_card)
+                            if selected_card in cards:
+                                cards.remove(selected_card)
+                            if selected_card not in hand:
+                                hand.append(selected_card)
+                                chosen_tile = None
 
                     # 如果不在任何区域，则从cards列表中移除
-                    if not in_middle_area and not in_hand_area and selected_card in cards:
+                    if not in_middle_area and not in_hand_area and selected_card in on_table:
+                        game.set_position(selected_card, *drag_origin)  # 桌面上已有的牌不能拿走
+                    elif not in_middle_area and not in_hand_area and selected_card in cards:
                         cards.remove(selected_card)
+                        board.remove(selected_card)
+                        game.untrack_card(selected_card)
 
+                    telemetry.add_time('validate', start)  # 放牌时桌面模型会重新检查受影响的牌组
                     selected_card = None
-                    need_update = True
 
 
             if event.type == pygame.MOUSEMOTION and dragging:
                 mx, my = pygame.mouse.get_pos()
-                selected_card.setPosition(mx - card_display_width / 2, my - card_display_height / 2)
-                print(f"Dragging card to position: {selected_card.x}, {selected_card.y}")
-
-            if event.type in [pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION]:
-                need_update = True
-
+                game.set_position(selected_card, mx - card_display_width / 2, my - card_display_height / 2)
+                telemetry.count('drag_events')
+                if telemetry.enabled(DEBUG):
+                    telemetry.log('drag', DEBUG, card=selected_card.id, pos=game.positions[selected_card.id])
+        telemetry.add_time('events', frame_start)
+
+        # 只描述这一帧要画什么，由 renderer 找出变化的区域再重画
+        scene = []
         for card in cards:
-            if card and not choosing_tiles:
-                card_image, card_rect = card.get_scaled_image(card_display_width, card_display_height)
-                screen.blit(card_image, card_rect)
-            elif card and choosing_tiles and card in drawn_tiles:
-                card_image, card_rect = card.get_scaled_image(card_display_width, card_display_height)
-                screen.blit(card_image, card_rect)
-
-        for slot in hand_area_slots:
-            screen.blit(board_background, (slot.x, slot.y))
+            if card:
+                scene.append((Card.loaded_images[card.image_key], game.positions[card.id]))
 
-        screen.blit(cardBack, cardBackPos)
-
-        for slot in placement_slots + hand_area_slots:
-            pygame.draw.rect(screen, (200, 200, 200), slot, 1)
-
-        for slot in left_hand_area_slots + right_hand_area_slots + top_hand_area_slots:
-            screen.blit(board_background, (slot.x, slot.y))
-
-        for card in cards:
-            card_image, card_rect = card.get_scaled_image(card_display_width, card_display_height)
-            screen.blit(card_image, card_rect)
+        # 无效的牌组实时标成红色
+        for slot_number in board.invalid_slots():
+            scene.append((invalid_marker, placement_slots[slot_number].topleft))
 
         for i in range(1, len(game.players)):
             robot_hand = game.players[i]
-            for j, card in enumerate(robot_hand):
-                if i == 1:
-                    x, y = left_hand_area_slots[j].x, left_hand_area_slots[j].y
-                elif i == 2:
-                    x, y = top_hand_area_slots[j].x, top_hand_area_slots[j].y
-                elif i == 3:
-                    x, y = right_hand_area_slots[j].x, right_hand_area_slots[j].y
+            seat_slots = (left_hand_area_slots, top_hand_area_slots, right_hand_area_slots)[i - 1]
+            for j, card in enumerate(robot_hand[:len(seat_slots)]):  # 摸牌多了放不下的不画
+                x, y = seat_slots[j].x, seat_slots[j].y
 
                 if show_cards:
-                    card_image, _ = card.get_scaled_image(card_display_width, card_display_height)
+                    card_image = Card.loaded_images[card.image_key]
                 else:
                     card_image = Card.loaded_images['back']
 
-                screen.blit(card_image, (x, y))
+                scene.append((card_image, (x, y)))
 
-        pygame.draw.rect(screen, (0, 128, 0), robot_play_button)
-        screen.blit(robot_play_text, (robot_play_button.x + 10, robot_play_button.y + 10))
-
-        pygame.draw.rect(screen, (0, 128, 0), done_button)
-        screen.blit(done_text, (1020, 710))
+        for card in game.players[game.current_player]:
+            scene.append((Card.loaded_images[card.image_key], game.positions[card.id]))
 
-        pygame.draw.rect(screen, (0, 128, 0), show_button)
-        screen.blit(show_text, (show_button.x + 10, show_button.y + 10))
+        time_left = max(timer_duration - (pygame.time.get_ticks() - timer_start), 0)
+        timer_text = renderer.render_text(timer_font, f'Time: {time_left // 1000}', (255, 255, 255))
+        scene.append((timer_text, (timer_rect.x + 10, timer_rect.y + 10)))
 
-        for card in game.players[game.current_player]:
-            card_image, card_rect = card.get_scaled_image(card_display_width, card_display_height)
-            screen.blit(card_image, card_rect)
+        if show_stats:
+            for i, line in enumerate(telemetry.overlay_lines()):
+                scene.append((renderer.render_text(stats_font, line, (255, 255, 0)), (210, 560 + i * 22)))
 
-        if need_update:
-            pygame.display.update()
+        start = telemetry.clock()
+        renderer.draw(scene)
+        telemetry.add_time('draw', start)
+        telemetry.count('blits', renderer.blits)
+        telemetry.add_time('frame', frame_start)
+        telemetry.end_frame()
+        clock.tick(fps)
 
+    telemetry.close()
     pygame.quit()
 
 if __name__ == "__main__":
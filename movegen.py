@@ -0,0 +1,88 @@
+# 出牌生成：从手牌和桌面牌组中列出所有合法的出牌，不依赖 pygame
+
+from collections import namedtuple
+from itertools import combinations
+
+from rules import MAX_GROUP_SIZE, MAX_MELD_SIZE, MELDS, MIN_MELD_SIZE, meld_mask
+from tiles import VALUES
+
+# meld_index 为 None 表示用手牌打出一组新牌，否则表示往桌面第 meld_index 组里加牌
+Move = namedtuple('Move', ['meld_index', 'cards'])
+
+
+class HandIndex():
+    # 按颜色和数值把手牌分桶，避免两两配对的嵌套循环
+    def __init__(self, hand):
+        self.jokers = []
+        self.by_value = {}  # 数值 -> 该数值的牌（颜色各不相同）
+        self.by_color = {}  # (颜色, 单双数) -> {数值: 牌}
+        for card in hand:
+            if card.is_joker():
+                self.jokers.append(card)
+                continue
+            self.by_value.setdefault(card.value, []).append(card)
+            self.by_color.setdefault((card.color, card.value % 2), {})[card.value] = card
+
+    def groups(self):
+        jokers = self.jokers
+        for value, cards in self.by_value.items():
+            for size in range(1, min(len(cards), MAX_GROUP_SIZE) + 1):
+                for real in combinations(cards, size):
+                    for used in range(len(jokers) + 1):
+                        if MIN_MELD_SIZE <= size + used <= MAX_GROUP_SIZE:
+                            yield list(real) + jokers[:used]
+
+    def runs(self):
+        jokers = self.jokers
+        for (color, parity), cards in self.by_color.items():
+            first = VALUES[0] if VALUES[0] % 2 == parity else VALUES[0] + 1
+            for start in range(first, VALUES[-1] + 1, 2):
+                for size in range(MIN_MELD_SIZE, MAX_MELD_SIZE + 1):
+                    stop = start + 2 * size
+                    if stop - 2 > VALUES[-1]:
+                        break
+                    present = [cards[value] for value in range(start, stop, 2) if value in cards]
+                    # 缺的位置用鬼牌补上，有的牌也可以换成鬼牌留着别用
+                    for used in range(size - len(present), len(jokers) + 1):
+                        for real in combinations(present, size - used):
+                            if real:
+                                yield list(real) + jokers[:used]
+
+    def extensions(self, meld):
+        # 能加到这组牌里的候选：同数值的牌、同颜色同单双数的牌和鬼牌
+        real = [card for card in meld if not card.is_joker()]
+        pool = []
+        if real and all(card.value == real[0].value for card in real):
+            pool.extend(card for card in self.by_value.get(real[0].value, ())
+                        if all(card.color != other.color for other in real))
+        if real and all(card.color == real[0].color for card in real):
+            pool.extend(self.by_color.get((real[0].color, real[0].value % 2), {}).values())
+        pool.extend(self.jokers)
+        return pool
+
+
+def generate_moves(hand, board=()):
+    # 逐个生成合法出牌（按需计算），同一组牌只生成一次
+    index = HandIndex(hand)
+    seen = set()
+    for cards in index.groups():
+        mask = meld_mask(cards)
+        if mask not in seen and mask in MELDS:
+            seen.add(mask)
+            yield Move(None, cards)
+    for cards in index.runs():
+        mask = meld_mask(cards)
+        if mask not in seen and mask in MELDS:
+            seen.add(mask)
+            yield Move(None, cards)
+
+    for meld_index, meld in enumerate(board):
+        base = meld_mask(meld)
+        pool = index.extensions(meld)
+        for size in range(1, min(len(pool), MAX_MELD_SIZE - len(meld)) + 1):
+            for cards in combinations(pool, size):
+                if len(index.jokers) == 2 and index.jokers[1] in cards and index.jokers[0] not in cards:
+                    continue  # 两张鬼牌作用相同，只用第一张
+                mask = base | meld_mask(cards)
+                if mask in MELDS and mask.bit_count() == len(meld) + size:
+                    yield Move(meld_index, list(cards))
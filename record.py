@@ -0,0 +1,203 @@
+# 无窗口录像：把一局电脑对局或一份对局日志直接画到内存里的图像上，按批写成 PNG 序列，
+# 安装了 ffmpeg 时再合成 GIF / MP4。状态没有变化的帧不重画，只延长上一帧的显示时间。
+#
+# 用法:
+#   python record.py game_17.rklog -d frames                 回放日志，每回合一帧
+#   python record.py --seed 5 --seats search,greedy -d frames -o game.gif
+#   python record.py game_17.rklog -d frames --every action  每个操作一帧
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # 不需要显示器
+import pygame
+
+from assets import AssetManager
+from engine import RummikubEngine
+from replay import decode_records, read_header
+
+CARD_WIDTH = 40
+CARD_HEIGHT = 52
+FRAME_SIZE = (1200, 600)
+FRAME_SECONDS = 0.5  # 每帧显示的时间
+BATCH = 16  # 攒够这么多帧一起写文件
+LIST_FILE = 'frames.txt'  # ffmpeg concat 格式的帧列表，包含每帧的显示时间
+MAX_TURNS = 1000
+
+BACKGROUND = (0, 90, 60)
+HIGHLIGHT = (255, 220, 0)
+WHITE = (255, 255, 255)
+
+
+class FrameRecorder():
+    # 挂到 engine.log 上：引擎每完成一个操作就调用 record，在这里决定是否截一帧
+    def __init__(self, out_dir, every='turn', frame_seconds=FRAME_SECONDS, batch=BATCH, workers=4):
+        pygame.init()
+        self.out_dir = out_dir
+        self.every = every
+        self.frame_seconds = frame_seconds
+        self.batch = batch
+        self.pool = ThreadPoolExecutor(workers)  # 写 PNG 时 pygame 会释放 GIL
+        self.images = AssetManager(CARD_WIDTH, CARD_HEIGHT).load_tiles()
+        self.font = pygame.font.Font(None, 24)
+        self.canvas = pygame.Surface(FRAME_SIZE)
+        self.game = None
+        self.last_key = None
+        self.pending = []  # 还没写出的 (序号, 图像)
+        self.durations = []  # 每帧的显示时间
+        self.skipped = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+    def attach(self, game):
+        self.game = game
+        game.log = self
+        self.capture()
+        return game
+
+    def record(self, name, args):
+        if self.every == 'action' or name in ('start_game', 'end_turn'):
+            self.capture()
+
+    def state_key(self):
+        game = self.game
+        return (tuple(tuple(card.id for card in meld) for meld in game.board),
+                tuple(tuple(card.id for card in hand) for hand in game.players),
+                game.current_player, len(game.public_pouch), tuple(game.break_ice))
+
+    def capture(self):
+        key = self.state_key()
+        if key == self.last_key:
+            self.durations[-1] += self.frame_seconds
+            self.skipped += 1
+            return
+        self.last_key = key
+        self.draw(self.game)
+        self.pending.append((len(self.durations), self.canvas.copy()))
+        self.durations.append(self.frame_seconds)
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def frame_path(self, index):
+        return os.path.join(self.out_dir, f'frame_{index:05d}.png')
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        list(self.pool.map(lambda frame: pygame.image.save(frame[1], self.frame_path(frame[0])), pending))
+
+    def draw(self, game):
+        canvas = self.canvas
+        canvas.fill(BACKGROUND)
+        status = f"Round {game.round}   Player {game.current_player}   Pouch {len(game.public_pouch)}"
+        if game.winner is not None:
+            status += f"   Winner {game.winner}"
+        canvas.blit(self.font.render(status, True, WHITE), (10, 8))
+
+        # 桌面：牌组从左到右排，放不下时换行，牌组之间空半张牌
+        x, y = 10, 36
+        for meld in game.board:
+            width = len(meld) * CARD_WIDTH
+            if x + width > FRAME_SIZE[0] - 10:
+                x, y = 10, y + CARD_HEIGHT + 6
+            for card in meld:
+                canvas.blit(self.images[card.image_key], (x, y))
+                x += CARD_WIDTH
+            x += CARD_WIDTH // 2
+
+        # 手牌：每个玩家一行，当前玩家用黄色框标出
+        y = FRAME_SIZE[1] - game.num_players * (CARD_HEIGHT + 8)
+        for player, hand in enumerate(game.players):
+            label = f"P{player}" + (" *" if game.break_ice[player] else "")
+            canvas.blit(self.font.render(label, True, WHITE), (10, y + CARD_HEIGHT // 2 - 8))
+            step = min(CARD_WIDTH, (FRAME_SIZE[0] - 70 - CARD_WIDTH) // max(len(hand) - 1, 1))  # 牌多时叠在一起
+            for i, card in enumerate(hand):
+                canvas.blit(self.images[card.image_key], (60 + i * step, y))
+            if player == game.current_player:
+                width = max(len(hand) - 1, 0) * step + CARD_WIDTH
+                pygame.draw.rect(canvas, HIGHLIGHT, (56, y - 3, width + 8, CARD_HEIGHT + 6), 2)
+            y += CARD_HEIGHT + 8
+        return canvas
+
+    def close(self):
+        self.flush()
+        self.pool.shutdown()
+        # 没有变化的帧合并到前一帧，所以每帧的显示时间可能不同
+        with open(os.path.join(self.out_dir, LIST_FILE), 'w') as f:
+            for index, duration in enumerate(self.durations):
+                f.write(f"file 'frame_{index:05d}.png'\nduration {duration:g}\n")
+            if self.durations:
+                f.write(f"file 'frame_{len(self.durations) - 1:05d}.png'\n")  # concat 需要最后一帧再出现一次
+
+    def encode(self, output):
+        # 用 ffmpeg 把 PNG 序列合成 GIF 或视频
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is needed to write animated files; the PNG frames are in " + self.out_dir)
+        command = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                   '-i', os.path.join(self.out_dir, LIST_FILE)]
+        if output.endswith('.gif'):
+            command += ['-vf', 'split[a][b];[a]palettegen[p];[b][p]paletteuse']
+        else:
+            command += ['-pix_fmt', 'yuv420p', '-vsync', 'vfr']
+        subprocess.run(command + [output], check=True)
+
+
+def record_replay(path, recorder):
+    with open(path, 'rb') as f:
+        data = f.read()
+    num_players, seed = read_header(data)
+    game = recorder.attach(RummikubEngine(num_players=num_players, seed=seed))
+    for name, args in decode_records(data):
+        getattr(game, name)(*args)
+    return game
+
+
+def record_game(seed, seat_names, recorder, deadline_ms=200):
+    from selfplay import make_robot
+    seats = [make_robot(name, deadline_ms) for name in seat_names]
+    game = recorder.attach(RummikubEngine(num_players=len(seats), seed=seed))
+    game.start_game()
+    turns = 0
+    while not game.is_over() and turns < MAX_TURNS:
+        seats[game.current_player].play_turn(game)
+        turns += 1
+    return game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a game or a move log to image files without a window.")
+    parser.add_argument('log', nargs='?', help="move log written by replay.MoveLog")
+    parser.add_argument('--seed', type=int, help="play a new robot game with this seed instead of a log")
+    parser.add_argument('--seats', default='search,greedy,greedy,greedy')
+    parser.add_argument('--deadline-ms', type=int, default=200)
+    parser.add_argument('-d', '--out-dir', default='frames')
+    parser.add_argument('-o', '--output', help="also encode an animated .gif or video with ffmpeg")
+    parser.add_argument('--every', choices=('turn', 'action'), default='turn')
+    parser.add_argument('--frame-seconds', type=float, default=FRAME_SECONDS)
+    args = parser.parse_args(argv)
+    if (args.log is None) == (args.seed is None):
+        parser.error("give either a move log or --seed")
+
+    recorder = FrameRecorder(args.out_dir, args.every, args.frame_seconds)
+    try:
+        if args.log:
+            record_replay(args.log, recorder)
+        else:
+            record_game(args.seed, args.seats.split(','), recorder, args.deadline_ms)
+    finally:
+        recorder.close()
+    print(f"{len(recorder.durations)} frames written to {args.out_dir}, {recorder.skipped} unchanged frames skipped")
+    if args.output:
+        try:
+            recorder.encode(args.output)
+        except RuntimeError as e:
+            print(e)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
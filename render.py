@@ -0,0 +1,75 @@
+# 界面绘制：只重画变化的区域（脏矩形），不变的背景预先画到一张缓存图层上
+
+import pygame
+
+FPS = 30  # 主循环的帧率上限
+
+
+class Renderer():
+    def __init__(self, screen, static_layer):
+        self.screen = screen
+        self.static_layer = static_layer  # 背景、牌槽、按钮等不会变化的部分
+        self.items = []  # 上一帧画出的 (图像, 位置)
+        self.text_cache = {}
+        self.full_redraw = True
+        self.blits = 0  # 上一帧 blit 的次数，用于统计
+
+    def render_text(self, font, text, color):
+        # 同样的文字只渲染一次，图像对象不变就不会被当作变化
+        key = (id(font), text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) > 256:
+                self.text_cache.clear()
+            surface = self.text_cache[key] = font.render(text, True, color)
+        return surface
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def draw(self, items):
+        # items: 这一帧要画的 (图像, 左上角位置) 列表，按从下到上的顺序
+        items = [(image, (int(x), int(y))) for image, (x, y) in items]
+        if self.full_redraw:
+            self.screen.blit(self.static_layer, (0, 0))
+            for image, pos in items:
+                self.screen.blit(image, pos)
+            self.blits = 1 + len(items)
+            pygame.display.update()
+            self.full_redraw = False
+            self.items = items
+            return 1
+
+        old = set((id(image), pos) for image, pos in self.items)
+        new = set((id(image), pos) for image, pos in items)
+        dirty = [image.get_rect(topleft=pos) for image, pos in self.items if (id(image), pos) not in new]
+        dirty += [image.get_rect(topleft=pos) for image, pos in items if (id(image), pos) not in old]
+        self.items = items
+        self.blits = 0
+        if not dirty:
+            return 0
+
+        # 相交的区域合并成一个矩形，减少重复绘制
+        merged = []
+        for rect in dirty:
+            for i, other in enumerate(merged):
+                if rect.colliderect(other):
+                    merged[i] = other.union(rect)
+                    break
+            else:
+                merged.append(rect)
+
+        screen = self.screen
+        blits = 0
+        for rect in merged:
+            screen.set_clip(rect)
+            screen.blit(self.static_layer, rect, rect)
+            blits += 1
+            for image, pos in items:
+                if rect.colliderect(image.get_rect(topleft=pos)):
+                    screen.blit(image, pos)
+                    blits += 1
+        self.blits = blits
+        screen.set_clip(None)
+        pygame.display.update(merged)
+        return len(merged)
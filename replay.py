@@ -0,0 +1,146 @@
+# 对局记录：只追加的二进制出牌日志，可以不经过界面回放到任意回合
+#
+# 文件格式：头部 b'RKLG' + 版本(1字节) + 玩家数(1字节) + 种子(8字节)，
+# 之后每条记录是 1 字节操作码加参数，牌都用 0..76 的编号表示（1字节）。
+
+import struct
+
+from engine import RummikubEngine
+from tiles import TILES
+
+MAGIC = b'RKLG'
+VERSION = 1
+HEADER = struct.Struct('<4sBBQ')
+NO_PLAYER = 255
+
+# 操作码 -> 引擎方法名，回放时直接按名字调用
+OPCODES = {
+    1: 'start_game',
+    2: 'draw_tile',
+    3: 'draw_two_tiles',
+    4: 'return_tile',
+    5: 'play_meld',
+    6: 'extend_meld',
+    7: 'rearrange',
+    8: 'undo_turn',
+    9: 'end_turn',
+}
+OPCODE_OF = {name: op for op, name in OPCODES.items()}
+
+
+def _cards_bytes(cards):
+    return bytes([len(cards)]) + bytes(card.id for card in cards)
+
+
+def encode_record(name, args):
+    out = bytearray([OPCODE_OF[name]])
+    if name == 'draw_tile':
+        player = args[0] if args and args[0] is not None else NO_PLAYER
+        out.append(player)
+    elif name == 'return_tile':
+        out.append(args[0].id)
+    elif name == 'play_meld':
+        out += _cards_bytes(args[0])
+    elif name == 'extend_meld':
+        out.append(args[0])
+        out += _cards_bytes(args[1])
+    elif name == 'rearrange':
+        out.append(len(args[0]))
+        for meld in args[0]:
+            out += _cards_bytes(meld)
+    return bytes(out)
+
+
+def _read_cards(data, pos):
+    # 牌数后面的牌不完整时返回 None
+    if pos >= len(data) or pos + 1 + data[pos] > len(data):
+        return None, len(data)
+    count = data[pos]
+    cards = [TILES[i] for i in data[pos + 1:pos + 1 + count]]
+    return cards, pos + 1 + count
+
+
+def decode_records(data, pos=HEADER.size):
+    # 逐条生成 (方法名, 参数元组)。对局中断时文件末尾可能只写了半条记录，读到这里就停下
+    while pos < len(data):
+        name = OPCODES.get(data[pos])
+        if name is None:
+            raise ValueError(f"Unknown opcode {data[pos]} at byte {pos} of the move log")
+        pos += 1
+        args = ()
+        if name in ('draw_tile', 'return_tile', 'extend_meld', 'rearrange') and pos >= len(data):
+            return
+        if name == 'draw_tile':
+            player = data[pos]
+            args = (None if player == NO_PLAYER else player,)
+            pos += 1
+        elif name == 'return_tile':
+            args = (TILES[data[pos]],)
+            pos += 1
+        elif name == 'play_meld':
+            cards, pos = _read_cards(data, pos)
+            if cards is None:
+                return
+            args = (cards,)
+        elif name == 'extend_meld':
+            meld_index = data[pos]
+            cards, pos = _read_cards(data, pos + 1)
+            if cards is None:
+                return
+            args = (meld_index, cards)
+        elif name == 'rearrange':
+            melds = []
+            count = data[pos]
+            pos += 1
+            for _ in range(count):
+                cards, pos = _read_cards(data, pos)
+                if cards is None:
+                    return
+                melds.append(cards)
+            args = (melds,)
+        yield name, args
+
+
+class MoveLog():
+    # 挂到 engine.log 上，引擎每次改变状态都会调用 record
+    def __init__(self, path, num_players, seed):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, num_players, seed))
+
+    def record(self, name, args):
+        self.file.write(encode_record(name, args))
+        if name == 'end_turn':
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def attach_log(game, path):
+    game.log = MoveLog(path, game.num_players, game.seed)
+    return game.log
+
+
+def read_header(data):
+    if len(data) < HEADER.size:
+        raise ValueError("Not a Rummikub move log")
+    magic, version, num_players, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a Rummikub move log")
+    return num_players, seed
+
+
+def replay(path, turns=None):
+    # 从日志重建对局；turns 不为 None 时在第 turns 个回合结束后停下
+    with open(path, 'rb') as f:
+        data = f.read()
+    num_players, seed = read_header(data)
+    game = RummikubEngine(num_players=num_players, seed=seed)
+    finished = 0
+    for name, args in decode_records(data):
+        if turns is not None and finished >= turns:
+            break
+        getattr(game, name)(*args)
+        if name == 'end_turn':
+            finished += 1
+    return game
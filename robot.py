@@ -0,0 +1,182 @@
+# 电脑玩家：可替换的出牌策略，默认使用限时的迭代加深搜索，不依赖 pygame
+
+import time
+from collections import OrderedDict
+
+from engine import OPENING_POINTS
+from rules import MAX_MELD_SIZE, MELDS_BY_TILE
+from tiles import TILES
+
+TILE_POINTS = [tile.points for tile in TILES]
+
+
+def tiles_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.id
+    return mask
+
+
+def mask_tiles(mask):
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(TILES[low.bit_length() - 1])
+        mask ^= low
+    return cards
+
+
+def mask_points(mask):
+    points = 0
+    while mask:
+        low = mask & -mask
+        points += TILE_POINTS[low.bit_length() - 1]
+        mask ^= low
+    return points
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class RobotStrategy():
+    # 所有电脑玩家的接口：play_turn 完成当前玩家的整个回合（包括 end_turn）
+    def play_turn(self, game):
+        raise NotImplementedError
+
+
+class GreedyRobot(RobotStrategy):
+    # 依次打出能找到的牌组，一组都打不出时 end_turn 会摸一张
+    def play_turn(self, game):
+        move = next(game.legal_moves(), None)
+        while move is not None and game.apply_move(move):
+            move = next(game.legal_moves(), None)
+        game.end_turn()
+
+
+class SearchRobot(RobotStrategy):
+    # 把桌面上的牌和手牌放在一起重新分组：桌面的牌必须全部用上，
+    # 尽量多打出手牌的分数。按牌组数量迭代加深，到时间就用已完成的最好结果。
+    # 置换表以 (桌面掩码, 手牌掩码, 剩余深度) 为键，超过容量时淘汰最久未用的条目。
+    def __init__(self, deadline_ms=200, table_size=200000):
+        self.deadline_ms = deadline_ms
+        self.table_size = table_size
+        self.table = OrderedDict()
+        self.deadline = 0
+        self.nodes = 0
+
+    def play_turn(self, game):
+        melds = self.choose_board(game)
+        if melds is None or not game.rearrange(melds):
+            GreedyRobot().play_turn(game)
+            return
+        game.end_turn()
+
+    def choose_board(self, game):
+        # 返回新的桌面牌组列表；没有值得出的牌时返回 None
+        hand = game.players[game.current_player]
+        opened = game.break_ice[game.current_player]
+        board_mask = tiles_mask(card for meld in game.board for card in meld) if opened else 0
+        hand_mask = tiles_mask(hand)
+        board_melds = [tiles_mask(meld) for meld in game.board] if opened else None
+        best = self.search(board_mask, hand_mask, board_melds)
+        if best is None or best[0] == 0:
+            return None
+        played = 0
+        for mask in best[1]:
+            played |= mask
+        if not opened and mask_points(played & hand_mask) < OPENING_POINTS:
+            return None
+        new_melds = [mask_tiles(mask) for mask in best[1]]
+        if opened:
+            return new_melds
+        return [list(meld) for meld in game.board] + new_melds
+
+    def search(self, board_mask, hand_mask, board_melds=None):
+        # 返回 (得分, 牌组掩码列表)，桌面无法重新分组时返回 None。
+        # board_melds 是桌面现有牌组的掩码：先保留它们、只用手牌组新牌组，得到一个随时可用的结果，
+        # 再在剩下的时间里搜索重新分组整个桌面
+        self.deadline = time.perf_counter() + self.deadline_ms / 1000
+        self.nodes = 0
+        best = None
+        max_depth = (board_mask | hand_mask).bit_count() // 3
+        try:
+            if board_melds is not None:
+                best = self._keep_board(board_melds, 0, hand_mask, {})
+            # 桌面的牌每组最多8张，组数更少的深度不可能用完桌面的牌
+            for depth in range(max(1, -(-board_mask.bit_count() // MAX_MELD_SIZE)), max_depth + 1):
+                result = self._search(board_mask, hand_mask, depth)
+                if result is not None and (best is None or result[0] > best[0]):
+                    best = result
+        except SearchTimeout:
+            pass
+        return best
+
+    def _keep_board(self, board_melds, index, hand_mask, memo):
+        # 桌面现有的牌组保持不变，只往里面加手牌，剩下的手牌另组新牌组
+        key = (index, hand_mask)
+        if key in memo:
+            return memo[key]
+        if index == len(board_melds):
+            best = self._search(0, hand_mask, hand_mask.bit_count() // 3)
+        else:
+            meld = board_melds[index]
+            pool = meld | hand_mask
+            best = None
+            for bigger in MELDS_BY_TILE[(meld & -meld).bit_length() - 1]:
+                if bigger & meld != meld or bigger & ~pool:
+                    continue
+                rest = self._keep_board(board_melds, index + 1, hand_mask & ~bigger, memo)
+                score = self._score(bigger & hand_mask) + rest[0]
+                if best is None or score > best[0]:
+                    best = (score, [bigger] + rest[1])
+        memo[key] = best
+        return best
+
+    def _search(self, board_mask, hand_mask, depth):
+        key = (board_mask, hand_mask, depth)
+        if key in self.table:
+            self.table.move_to_end(key)
+            return self.table[key]
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        if board_mask:
+            # 桌面上编号最小的牌必须放进某一组
+            best = None
+            if depth > 0:
+                pool = board_mask | hand_mask
+                low = (board_mask & -board_mask).bit_length() - 1
+                for meld in MELDS_BY_TILE[low]:
+                    if meld & ~pool:
+                        continue
+                    rest = self._search(board_mask & ~meld, hand_mask & ~meld, depth - 1)
+                    if rest is not None:
+                        score = self._score(meld & hand_mask) + rest[0]
+                        if best is None or score > best[0]:
+                            best = (score, [meld] + rest[1])
+        else:
+            # 桌面已经分好组，剩下的手牌可以出也可以留着
+            best = (0, [])
+            if depth > 0 and hand_mask:
+                low_bit = hand_mask & -hand_mask
+                skip = self._search(0, hand_mask ^ low_bit, depth)
+                if skip[0] > best[0]:
+                    best = skip
+                for meld in MELDS_BY_TILE[low_bit.bit_length() - 1]:
+                    if meld & ~hand_mask:
+                        continue
+                    rest = self._search(0, hand_mask & ~meld, depth - 1)
+                    score = self._score(meld) + rest[0]
+                    if score > best[0]:
+                        best = (score, [meld] + rest[1])
+
+        self.table[key] = best
+        if len(self.table) > self.table_size:
+            self.table.popitem(last=False)
+        return best
+
+    def _score(self, played_mask):
+        # 先比较打出的分数，分数相同时多出牌更好（鬼牌是0分）
+        return mask_points(played_mask) * 32 + played_mask.bit_count()
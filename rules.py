@@ -0,0 +1,136 @@
+# 出牌规则：牌组判断和整行切分，不依赖 pygame
+
+from itertools import combinations
+
+from tiles import COLORS, JOKER_IDS, NUM_TILES, VALUES, tile_id
+
+MIN_MELD_SIZE = 3
+MAX_MELD_SIZE = 8  # 同色单双数顺子最长为 1,3,...,15 共8张
+MAX_GROUP_SIZE = len(COLORS)  # 同数值不同颜色最多5张
+
+GROUP = 1  # 同数值、颜色各不相同
+RUN = 2  # 同颜色、单双数相同、每次加2
+
+# 用牌的编号做位掩码：一组牌对应一个整数，预先算好所有有效牌组
+MELDS = {}
+
+
+def _add_meld(real_ids, kind):
+    mask = 0
+    for i in real_ids:
+        mask |= 1 << i
+    # 任意位置都可以用鬼牌代替（最多两张鬼牌）
+    for jokers in range(len(JOKER_IDS) + 1):
+        for replaced in combinations(range(len(real_ids)), jokers):
+            if jokers == len(real_ids):
+                continue
+            base = mask
+            for index in replaced:
+                base &= ~(1 << real_ids[index])
+            for joker_ids in combinations(JOKER_IDS, jokers):
+                key = base
+                for i in joker_ids:
+                    key |= 1 << i
+                MELDS[key] = MELDS.get(key, 0) | kind
+
+
+def _build_melds():
+    for value in VALUES:
+        for size in range(MIN_MELD_SIZE, MAX_GROUP_SIZE + 1):
+            for colors in combinations(COLORS, size):
+                _add_meld([tile_id(color, value) for color in colors], GROUP)
+    for color in COLORS:
+        for start in VALUES:
+            for size in range(MIN_MELD_SIZE, MAX_MELD_SIZE + 1):
+                values = range(start, start + 2 * size, 2)
+                if values[-1] > VALUES[-1]:
+                    break
+                _add_meld([tile_id(color, value) for value in values], RUN)
+
+
+_build_melds()
+
+# 每张牌 -> 包含这张牌的所有有效牌组掩码，搜索时按牌查找
+MELDS_BY_TILE = [[] for _ in range(NUM_TILES)]
+for _mask in MELDS:
+    for _i in range(NUM_TILES):
+        if _mask >> _i & 1:
+            MELDS_BY_TILE[_i].append(_mask)
+
+
+def meld_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.id
+    return mask
+
+
+def meld_kind(cards):
+    # 返回 GROUP / RUN（可能两者都是），无效时返回 0
+    if len(cards) < MIN_MELD_SIZE:
+        return 0
+    mask = meld_mask(cards)
+    if mask.bit_count() != len(cards):
+        return 0  # 同一张牌出现了两次
+    return MELDS.get(mask, 0)
+
+
+def is_valid_combination(cards):
+    return meld_kind(cards) != 0
+
+
+def partition_row(cards):
+    # 把一行牌（按从左到右的顺序）切成连续的有效牌组。
+    # 返回 (牌组列表, 无效的牌)：能切分时无效牌为空列表，否则牌组列表为 None。
+    n = len(cards)
+    valid = []  # 所有有效牌组 cards[start:end] 的 (start, end)
+    for start in range(n):
+        mask = 0
+        for end in range(start + 1, min(start + MAX_MELD_SIZE, n) + 1):
+            mask |= 1 << cards[end - 1].id
+            if end - start >= MIN_MELD_SIZE and mask in MELDS and mask.bit_count() == end - start:
+                valid.append((start, end))
+
+    # head[i]: 前 i 张牌可以切分；back[i]: 对应最后一组的起点
+    head = [False] * (n + 1)
+    back = [0] * (n + 1)
+    head[0] = True
+    for start, end in sorted(valid, key=lambda span: span[1]):
+        if head[start] and not head[end]:
+            head[end] = True
+            back[end] = start
+
+    if head[n]:
+        melds = []
+        end = n
+        while end > 0:
+            start = back[end]
+            melds.append(cards[start:end])
+            end = start
+        melds.reverse()
+        return melds, []
+
+    # tail[i]: 从第 i 张到行尾可以切分
+    tail = [False] * (n + 1)
+    tail[n] = True
+    for start, end in sorted(valid, key=lambda span: -span[0]):
+        if tail[end]:
+            tail[start] = True
+
+    # 不属于任何一个能和左边或右边接上的牌组的牌，就是导致整行无效的牌
+    covered = [False] * n
+    for start, end in valid:
+        if head[start] or tail[end]:
+            for i in range(start, end):
+                covered[i] = True
+    invalid = [card for card, ok in zip(cards, covered) if not ok]
+    if not invalid:
+        # 左右两边各自能切分但接不上，从能切分的最长前缀之后开始报告
+        reached = max(i for i in range(n + 1) if head[i])
+        invalid = cards[reached:]
+    return None, invalid
+
+
+def is_row_valid(cards):
+    melds, _ = partition_row(cards)
+    return melds is not None
@@ -0,0 +1,175 @@
+# 批量自对弈：用多进程跑很多局电脑对局，逐局写入结果文件并汇总统计
+#
+# 用法: python selfplay.py -n 10000 --seats search,greedy,greedy,greedy --output results.csv
+
+import argparse
+import csv
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+from engine import RummikubEngine
+from replay import attach_log
+from robot import GreedyRobot, SearchRobot
+
+MAX_TURNS = 1000  # 防止异常对局一直进行下去
+
+_seats = None  # 每个进程里的电脑玩家，在 _init_worker 中创建
+_log_dir = None
+
+
+def make_robot(name, deadline_ms):
+    if name == 'greedy':
+        return GreedyRobot()
+    if name == 'search':
+        return SearchRobot(deadline_ms=deadline_ms)
+    raise ValueError(f"Unknown robot strategy: {name}")
+
+
+def _init_worker(seat_names, deadline_ms, log_dir):
+    global _seats, _log_dir
+    _seats = [make_robot(name, deadline_ms) for name in seat_names]
+    _log_dir = log_dir
+
+
+def play_game(seed):
+    # 用给定种子完整地下一局，返回一行结果
+    game = RummikubEngine(num_players=len(_seats), seed=seed)
+    if _log_dir:
+        attach_log(game, os.path.join(_log_dir, f'game_{seed}.rklog'))
+    game.start_game()
+    opening_turn = [None] * game.num_players
+    turns = 0
+    while not game.is_over() and turns < MAX_TURNS:
+        player = game.current_player
+        _seats[player].play_turn(game)
+        turns += 1
+        if opening_turn[player] is None and game.break_ice[player]:
+            opening_turn[player] = turns
+    if game.log:
+        game.log.close()
+    return {
+        'seed': seed,
+        'winner': game.final_winner(),  # 没人出完牌时是剩余手牌分数最少的玩家
+        'went_out': game.winner is not None,
+        'turns': turns,
+        'pouch_left': len(game.public_pouch),
+        'scores': game.scores(),
+        'points_left': [game.hand_points(i) for i in range(game.num_players)],
+        'opening_turn': opening_turn,
+    }
+
+
+class Summary():
+    # 只保存累计值，内存占用和对局数量无关
+    def __init__(self, seat_names):
+        self.seat_names = seat_names
+        seats = len(seat_names)
+        self.games = 0
+        self.blocked = 0  # 没人出完牌的局数
+        self.turns = 0
+        self.pouch_left = 0
+        self.wins = [0] * seats
+        self.went_out = [0] * seats
+        self.scores = [0] * seats
+        self.points_left = [0] * seats
+        self.opened = [0] * seats
+        self.opening_turn = [0] * seats
+
+    def add(self, result):
+        self.games += 1
+        self.turns += result['turns']
+        self.pouch_left += result['pouch_left']
+        self.wins[result['winner']] += 1
+        if result['went_out']:
+            self.went_out[result['winner']] += 1
+        else:
+            self.blocked += 1
+        for seat in range(len(self.seat_names)):
+            self.scores[seat] += result['scores'][seat]
+            self.points_left[seat] += result['points_left'][seat]
+            if result['opening_turn'][seat] is not None:
+                self.opened[seat] += 1
+                self.opening_turn[seat] += result['opening_turn'][seat]
+
+    def report(self):
+        games = max(self.games, 1)
+        return {
+            'games': self.games,
+            'blocked_rate': self.blocked / games,
+            'avg_turns': self.turns / games,
+            'avg_pouch_left': self.pouch_left / games,
+            'seats': [{
+                'strategy': name,
+                'win_rate': self.wins[seat] / games,
+                'went_out_rate': self.went_out[seat] / games,
+                'avg_score': self.scores[seat] / games,
+                'avg_points_left': self.points_left[seat] / games,
+                'open_rate': self.opened[seat] / games,
+                'avg_opening_turn': self.opening_turn[seat] / self.opened[seat] if self.opened[seat] else None,
+            } for seat, name in enumerate(self.seat_names)],
+        }
+
+
+def result_row(result):
+    row = [result['seed'], result['winner'], int(result['went_out']), result['turns'], result['pouch_left']]
+    row += result['scores'] + result['points_left']
+    row += ['' if turn is None else turn for turn in result['opening_turn']]
+    return row
+
+
+def run(games, seat_names, first_seed=0, deadline_ms=20, workers=None, output=None, log_dir=None):
+    summary = Summary(seat_names)
+    seats = range(len(seat_names))
+    out = open(output, 'w', newline='') if output else None
+    try:
+        writer = None
+        if out:
+            writer = csv.writer(out)
+            writer.writerow(['seed', 'winner', 'went_out', 'turns', 'pouch_left']
+                            + [f'score_{i}' for i in seats]
+                            + [f'points_left_{i}' for i in seats]
+                            + [f'opening_turn_{i}' for i in seats])
+        seeds = range(first_seed, first_seed + games)
+        with Pool(workers, initializer=_init_worker, initargs=(seat_names, deadline_ms, log_dir)) as pool:
+            # 结果按完成顺序逐条写出，不在内存中保留
+            for result in pool.imap_unordered(play_game, seeds, chunksize=16):
+                summary.add(result)
+                if writer:
+                    writer.writerow(result_row(result))
+    finally:
+        if out:
+            out.close()
+    return summary.report()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run robot self-play games in parallel.")
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('--seats', default='search,greedy,greedy,greedy',
+                        help="comma separated strategy per seat: search or greedy")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument('--deadline-ms', type=int, default=20, help="search robot time limit per move")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('-o', '--output', help="CSV file with one line per game")
+    parser.add_argument('--summary', help="write the aggregated statistics to this JSON file")
+    parser.add_argument('--log-dir', help="write a replayable move log for every game into this directory")
+    args = parser.parse_args(argv)
+
+    seat_names = args.seats.split(',')
+    for name in seat_names:
+        make_robot(name, args.deadline_ms)  # 提前检查策略名
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+    report = run(args.games, seat_names, args.seed, args.deadline_ms, args.workers, args.output, args.log_dir)
+    text = json.dumps(report, indent=2)
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# 联网对战服务器：一个进程里用 asyncio 同时运行很多张牌桌
+#
+# 协议是一行一个 JSON 消息（TCP）：
+#   客户端 -> 服务器
+#     {"op": "join", "table": "t1", "seat": 0}       加入牌桌的某个座位（seat 可省略）
+#     {"op": "play", "rows": [[3, 5, 7], [20, 35]]}   出牌：新的整个桌面，每行是一组连续的牌
+#     {"op": "pass"}                                  不出牌，摸一张
+#   服务器 -> 客户端
+#     {"op": "joined", "table": ..., "seat": ...}
+#     {"op": "diff", ...}   只包含变化的字段：add/remove（自己的手牌）、board、turn、counts、pouch、opened
+#     {"op": "error", "msg": ...}
+#     {"op": "over", "winner": ..., "went_out": true/false, "scores": [...]}
+# 没有人坐的座位由电脑代打；每回合限时 60 秒，超时自动摸牌并轮到下一个玩家。
+#
+# 用法: python server.py --port 8765
+
+import argparse
+import asyncio
+import json
+
+import rules
+from engine import OPENING_POINTS, RummikubEngine
+from robot import GreedyRobot
+from tiles import NUM_TILES, TILES
+
+TURN_SECONDS = 60
+NUM_SEATS = 4
+
+
+def encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+
+class Table():
+    def __init__(self, name, turn_seconds=TURN_SECONDS, seed=None):
+        self.name = name
+        self.turn_seconds = turn_seconds
+        self.game = RummikubEngine(num_players=NUM_SEATS, seed=seed)
+        self.game.start_game()
+        self.seats = [None] * NUM_SEATS  # 座位 -> 客户端的 writer，None 表示电脑代打
+        self.views = [None] * NUM_SEATS  # 每个座位上次发出去的状态，用来计算差异
+        self.robot = GreedyRobot()
+        self.turn_done = asyncio.Event()
+        self.task = None
+
+    def free_seat(self, seat=None):
+        if seat is None:
+            return next((i for i, writer in enumerate(self.seats) if writer is None), None)
+        if 0 <= seat < NUM_SEATS and self.seats[seat] is None:
+            return seat
+        return None
+
+    def view(self, seat):
+        game = self.game
+        return {
+            'hand': sorted(card.id for card in game.players[seat]),
+            'board': [[card.id for card in meld] for meld in game.board],
+            'turn': game.current_player,
+            'counts': [len(hand) for hand in game.players],
+            'pouch': len(game.public_pouch),
+            'opened': list(game.break_ice),
+        }
+
+    def diff(self, seat):
+        # 和这个座位上次收到的状态比较，只发变化的部分
+        new = self.view(seat)
+        old = self.views[seat]
+        self.views[seat] = new
+        if old is None:
+            return {'op': 'diff', 'add': new['hand'], 'remove': [],
+                    **{key: value for key, value in new.items() if key != 'hand'}}
+        message = {'op': 'diff'}
+        old_hand, new_hand = set(old['hand']), set(new['hand'])
+        if old_hand != new_hand:
+            message['add'] = sorted(new_hand - old_hand)
+            message['remove'] = sorted(old_hand - new_hand)
+        for key in ('board', 'turn', 'counts', 'pouch', 'opened'):
+            if old[key] != new[key]:
+                message[key] = new[key]
+        return message if len(message) > 1 else None
+
+    async def send(self, seat, message):
+        writer = self.seats[seat]
+        if writer is None:
+            return
+        try:
+            writer.write(encode(message))
+            await writer.drain()
+        except ConnectionError:
+            self.leave(seat)
+
+    async def broadcast(self):
+        for seat in range(NUM_SEATS):
+            if self.seats[seat] is not None:
+                message = self.diff(seat)
+                if message:
+                    await self.send(seat, message)
+
+    def leave(self, seat):
+        self.seats[seat] = None
+        self.views[seat] = None
+        if self.game.current_player == seat:
+            self.turn_done.set()  # 换电脑接着打
+
+    def play(self, seat, rows):
+        # 校验并执行一个玩家的出牌，返回错误信息，成功时返回 None
+        game = self.game
+        if game.current_player != seat:
+            return "Not your turn"
+        try:
+            if not all(type(i) is int and 0 <= i < NUM_TILES for row in rows for i in row):
+                return "Unknown tile"  # 负数会从 TILES 末尾取牌，true/false 也会被当成 1/0
+        except TypeError:
+            return "Unknown tile"
+        rows = [[TILES[i] for i in row] for row in rows]
+        melds = []
+        for row in rows:
+            row_melds, invalid = rules.partition_row(row)
+            if row_melds is None:
+                return f"Invalid row: {[card.id for card in invalid]}"
+            melds.extend(row_melds)
+        if not game.rearrange(melds):
+            return "Illegal move"
+        if not game.break_ice[seat] and game.turn_points() < OPENING_POINTS:
+            # 不检查的话 end_turn 会悄悄撤回这些牌并摸一张，客户端收不到错误
+            points = game.turn_points()
+            game.undo_turn()
+            return f"Opening needs {OPENING_POINTS} points, got {points}"
+        game.end_turn()
+        self.turn_done.set()
+        return None
+
+    def pass_turn(self, seat):
+        if self.game.current_player != seat:
+            return "Not your turn"
+        self.game.end_turn()
+        self.turn_done.set()
+        return None
+
+    async def run(self):
+        game = self.game
+        while not game.is_over():
+            seat = game.current_player
+            if self.seats[seat] is None:
+                self.robot.play_turn(game)
+                await asyncio.sleep(0)  # 让其他牌桌也有机会运行
+            else:
+                self.turn_done.clear()
+                try:
+                    await asyncio.wait_for(self.turn_done.wait(), self.turn_seconds)
+                except asyncio.TimeoutError:
+                    # 超时：撤回这一回合的改动，摸一张牌，轮到下一个玩家
+                    game.undo_turn()
+                    game.end_turn()
+            await self.broadcast()
+        # 牌堆摸完没人出完牌时 winner 是剩余手牌分数最少的玩家，went_out 为 false
+        over = {'op': 'over', 'winner': game.final_winner(), 'went_out': game.winner is not None,
+                'scores': game.scores()}
+        for seat in range(NUM_SEATS):
+            await self.send(seat, over)
+
+
+class GameServer():
+    def __init__(self, turn_seconds=TURN_SECONDS):
+        self.turn_seconds = turn_seconds
+        self.tables = {}
+
+    def table(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = Table(name, self.turn_seconds)
+        return table
+
+    def start_table(self, table):
+        if table.task is None:
+            table.task = asyncio.ensure_future(table.run())
+            table.task.add_done_callback(lambda _: self.tables.pop(table.name, None))
+
+    async def handle(self, reader, writer):
+        table = None
+        seat = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    op = message['op']
+                except (ValueError, KeyError, TypeError):
+                    writer.write(encode({'op': 'error', 'msg': "Bad message"}))
+                    continue
+
+                if op == 'join':
+                    requested = message.get('seat')
+                    if table is not None:
+                        error = "Already seated"
+                    elif requested is not None and type(requested) is not int:  # true/false 也不是座位号
+                        error = "Bad seat"
+                    else:
+                        candidate = self.table(str(message.get('table', 'default')))
+                        seat = candidate.free_seat(requested)
+                        if seat is None:
+                            error = "No free seat"
+                        else:
+                            error = None
+                            table = candidate
+                            table.seats[seat] = writer
+                            writer.write(encode({'op': 'joined', 'table': table.name, 'seat': seat}))
+                            writer.write(encode(table.diff(seat)))
+                            self.start_table(table)
+                elif table is None:
+                    error = "Join a table first"
+                elif op == 'play':
+                    error = table.play(seat, message.get('rows', []))
+                elif op == 'pass':
+                    error = table.pass_turn(seat)
+                else:
+                    error = f"Unknown op: {op}"
+                if error:
+                    writer.write(encode({'op': 'error', 'msg': error}))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if table is not None and table.seats[seat] is writer:
+                table.leave(seat)
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Rummikub table server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--turn-seconds', type=float, default=TURN_SECONDS)
+    args = parser.parse_args(argv)
+    asyncio.run(GameServer(args.turn_seconds).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# 对局快照：把整局状态存成固定布局的字节串，用于搜索时分叉、保存和继续对局
+#
+# 布局（共 SNAPSHOT_SIZE 字节，小端）:
+#   头部   b'RKSS' 版本 玩家数 当前玩家 连续不出牌次数 回合(2字节) 赢家(255=无) 破冰位掩码 种子(8字节)
+#   手牌数 MAX_PLAYERS 字节；牌堆张数 1 字节；牌组数 1 字节；每组张数 MAX_MELDS 字节
+#   牌     77 字节：依次是各玩家手牌、牌堆、桌面各组牌的编号
+# 随机数生成器的状态较大（约2.5KB），只在 save() 保存到文件时附加在后面。
+
+import random
+import struct
+from array import array
+
+from engine import DrawPile, RummikubEngine
+from tiles import NUM_TILES, TILES
+
+MAGIC = b'RKSS'
+VERSION = 1
+MAX_PLAYERS = 8
+MAX_MELDS = NUM_TILES // 3
+NO_WINNER = 255
+
+HEADER = struct.Struct('<4sBBBBHBBQ')
+SIZES_OFFSET = HEADER.size
+POUCH_OFFSET = SIZES_OFFSET + MAX_PLAYERS
+MELDS_OFFSET = POUCH_OFFSET + 1
+MELD_SIZES_OFFSET = MELDS_OFFSET + 1
+TILES_OFFSET = MELD_SIZES_OFFSET + MAX_MELDS
+SNAPSHOT_SIZE = TILES_OFFSET + NUM_TILES
+
+
+def snapshot(game):
+    # 只能在回合之间拍快照：回合中途还有需要撤回的改动
+    if game.turn_backup is not None:
+        raise ValueError("Cannot snapshot in the middle of a turn")
+    if game.num_players > MAX_PLAYERS:
+        raise ValueError(f"Snapshots support at most {MAX_PLAYERS} players")
+    data = bytearray(SNAPSHOT_SIZE)
+    opened = 0
+    for player, flag in enumerate(game.break_ice):
+        if flag:
+            opened |= 1 << player
+    HEADER.pack_into(data, 0, MAGIC, VERSION, game.num_players, game.current_player, game.passes,
+                     game.round, NO_WINNER if game.winner is None else game.winner, opened, game.seed)
+    pos = TILES_OFFSET
+    for player, hand in enumerate(game.players):
+        data[SIZES_OFFSET + player] = len(hand)
+        data[pos:pos + len(hand)] = bytes(card.id for card in hand)
+        pos += len(hand)
+    pouch = game.public_pouch.tiles
+    data[POUCH_OFFSET] = len(pouch)
+    data[pos:pos + len(pouch)] = bytes(card.id for card in pouch)
+    pos += len(pouch)
+    data[MELDS_OFFSET] = len(game.board)
+    for i, meld in enumerate(game.board):
+        data[MELD_SIZES_OFFSET + i] = len(meld)
+        data[pos:pos + len(meld)] = bytes(card.id for card in meld)
+        pos += len(meld)
+    return bytes(data)
+
+
+def restore(data, rng_state=None):
+    magic, version, num_players, current_player, passes, game_round, winner, opened, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a Rummikub snapshot")
+    # 跳过 __init__，不需要重新创建和洗一副牌
+    game = RummikubEngine.__new__(RummikubEngine)
+    game.seed = seed
+    game.rng = random.Random(seed)
+    if rng_state is not None:
+        game.rng.setstate(rng_state)
+    game.log = None
+    game.logging = False
+    game.num_players = num_players
+    game.current_player = current_player
+    game.round = game_round
+    game.passes = passes
+    game.winner = None if winner == NO_WINNER else winner
+    game.break_ice = [bool(opened >> player & 1) for player in range(num_players)]
+    game.turn_backup = None
+    game.deck = []
+
+    tiles = [TILES[i] for i in data[TILES_OFFSET:TILES_OFFSET + NUM_TILES]]
+    pos = 0
+    game.players = []
+    for player in range(num_players):
+        size = data[SIZES_OFFSET + player]
+        game.players.append(tiles[pos:pos + size])
+        pos += size
+    size = data[POUCH_OFFSET]
+    game.public_pouch = DrawPile(tiles[pos:pos + size], game.rng)
+    pos += size
+    game.board = []
+    for i in range(data[MELDS_OFFSET]):
+        size = data[MELD_SIZES_OFFSET + i]
+        game.board.append(tiles[pos:pos + size])
+        pos += size
+    return game
+
+
+def fork(game):
+    # 分叉出一个独立的对局副本：牌是共享的不可变对象，只复制各个列表；
+    # 随机数状态也一起复制，两边之后摸到的牌相同
+    return restore(snapshot(game), game.rng.getstate())
+
+
+def save(game, path):
+    version, state, gauss = game.rng.getstate()
+    with open(path, 'wb') as f:
+        f.write(snapshot(game))
+        f.write(struct.pack('<B', version))
+        f.write(array('I', state).tobytes())
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    rng_state = None
+    if len(data) > SNAPSHOT_SIZE:
+        version = data[SNAPSHOT_SIZE]
+        state = array('I')
+        state.frombytes(data[SNAPSHOT_SIZE + 1:])
+        rng_state = (version, tuple(state), None)
+    return restore(data, rng_state)
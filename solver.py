@@ -0,0 +1,292 @@
+# 精确求解：手牌加上桌面的牌能否全部组成有效牌组，以及怎样出牌能打出最多分数
+#
+# 按数值从 1 到 15、每个数值里按颜色逐张决定：这张牌接到顺子上、放进同点组还是留在手里，
+# 顺子的这一格也可以用鬼牌补。同颜色同奇偶的牌是一条“链”（共 5 x 2 = 10 条），顺子只能在链上连续延伸，
+# 所以状态只需要记录每条链上正在延伸的顺子长度（0、1、2、3 及以上，每条链 2 位）、已用的鬼牌数
+# 和这个数值上已放进同点组的张数，相同的状态只算一次。
+#
+# 剪枝：剩下的手牌即使全部打出也超不过已找到的结果时，这个分支不再展开；这样没算完的状态记为
+# “不超过某分”，以后要求更低时才重新计算。
+#
+# 鬼牌只是多打出一张（0分）时可以放在任何还有空位的牌组上，放在哪里都一样。所以先只在鬼牌
+# 真正需要的地方（补顺子的空格、凑够3张）搜索，剩下的鬼牌最后再找空位放；链上的状态因此可以更早清零。
+# 找不到空位的少见情况再完整搜索一遍。
+
+import time
+from collections import namedtuple
+
+from engine import OPENING_POINTS
+from robot import SearchTimeout
+from rules import MAX_GROUP_SIZE, MIN_MELD_SIZE, is_valid_combination
+from tiles import COLORS, VALUES, get_tile
+
+Solution = namedtuple('Solution', ['melds', 'played', 'points'])
+
+ABSENT = 0
+OPTIONAL = 1  # 手牌，可以出也可以留着
+REQUIRED = 2  # 必须出的手牌（play_all）
+BOARD = 3  # 桌面上的牌，必须用上，不计分
+
+NUM_COLORS = len(COLORS)
+NUM_CHAINS = 2 * NUM_COLORS
+CHAIN_MASK = 3
+LAST_VALUE = VALUES[-1]
+TILE_SCORE = 32  # 得分 = 分数 * 32 + 张数，和 robot.SearchRobot 一样分数相同时多出牌更好
+HINT_DEADLINE_MS = 100  # 有鬼牌的少数局面要算到1秒左右，界面上的提示不等那么久
+
+# 每一步的选择：这张真牌接到顺子上 / 鬼牌接到顺子上 / 这张真牌放进同点组
+RUN_REAL = 1
+RUN_JOKER = 2
+TO_GROUP = 4
+
+
+def _chain(color, value):
+    return 2 * (color - 1) + value % 2
+
+
+class _Solver():
+    def __init__(self, hand, board, play_all, spare_jokers_last=True, deadline=None):
+        self.args = (hand, board, play_all)
+        self.deadline = deadline  # time.perf_counter() 的截止时间，None 表示不限时
+        self.nodes = 0
+        # status[颜色序号][数值]，数值多留几格，看后面的格子时不用判断越界
+        self.status = [[ABSENT] * (LAST_VALUE + 6) for _ in COLORS]
+        self.hand_jokers = []
+        self.board_jokers = []
+        for card in board:
+            if card.is_joker():
+                self.board_jokers.append(card)
+            else:
+                self.status[card.color - 1][card.value] = BOARD
+        for card in hand:
+            if card.is_joker():
+                self.hand_jokers.append(card)
+            else:
+                self.status[card.color - 1][card.value] = REQUIRED if play_all else OPTIONAL
+        self.jokers = len(self.board_jokers) + len(self.hand_jokers)
+        self.required_jokers = self.jokers if play_all else len(self.board_jokers)
+        self.spare_jokers_last = spare_jokers_last  # 多余的鬼牌最后再放
+        # (数值, 颜色序号, 链状态, 已用鬼牌, 同点组张数) -> [是否精确, 得分或上限, 选择, 下一步]
+        self.memo = {}
+
+        status = self.status
+        # later[数值][颜色序号]：这个数值上从这个颜色起还有几张牌，用来判断同点组还能不能凑够3张
+        self.later = [[sum(1 for row in status[index:] if row[value]) for index in range(NUM_COLORS + 1)]
+                      for value in range(LAST_VALUE + 1)]
+        # 从这一格开始一个顺子时，后面两格缺几张牌（超出 15 的算缺很多）
+        self.missing = [[sum(1 for step in (2, 4) if not row[value + step]) if value + 4 <= LAST_VALUE else 3
+                         for value in range(LAST_VALUE + 1)] for row in status]
+        # 从 (数值, 颜色) 这一步往后所有手牌都打出的得分，用作上限
+        self.remaining = {(LAST_VALUE + 1, 0): len(self.hand_jokers)}
+        total = len(self.hand_jokers)
+        for value in reversed(VALUES):
+            self.remaining[(value, NUM_COLORS)] = total
+            for index in reversed(range(NUM_COLORS)):
+                if status[index][value] in (OPTIONAL, REQUIRED):
+                    total += min(value, 10) * TILE_SCORE + 1
+                self.remaining[(value, index)] = total
+
+    def best(self, value, index, state, used, group, floor):
+        # 从这一步往后能得到的最高分；最高分不超过 floor（或无解）时返回 None。
+        # group 是这个数值上已经放进同点组的真牌张数（3张以上不用再区分）
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if index == 0:
+            state = self._settle(value, state, used)
+            if state is None:
+                return None
+        elif 0 < group < MIN_MELD_SIZE and group + self.later[value][index] + self.jokers - used < MIN_MELD_SIZE:
+            return None
+        key = (value, index, state, used, group)
+        entry = self.memo.get(key)
+        if entry is not None:
+            exact, score = entry[0], entry[1]
+            if exact:
+                return score if score is not None and score > floor else None
+            if floor >= score:
+                return None  # 上次已经确定不超过 score
+
+        found = [None, None, None]
+        if value > LAST_VALUE:
+            # 所有顺子都要够3张，必须用的鬼牌都要用上；打出的手牌鬼牌算0分1张
+            if all(state >> 2 * k & CHAIN_MASK in (0, 3) for k in range(NUM_CHAINS)):
+                if self.spare_jokers_last:
+                    found[0] = len(self.hand_jokers)  # 剩下的鬼牌都放到有空位的牌组上
+                elif used >= self.required_jokers:
+                    found[0] = max(used - len(self.board_jokers), 0)
+            exact = True
+        else:
+            if index == NUM_COLORS:
+                self._groups(found, value, state, used, group, floor)
+            else:
+                self._colors(found, value, index, state, used, group, floor)
+            exact = found[0] is not None
+        if not exact:
+            self.memo[key] = [False, floor, None, None]
+            return None
+        self.memo[key] = [True, found[0], found[1], found[2]]
+        return found[0] if found[0] is not None and found[0] > floor else None
+
+    def _try(self, found, floor, gain, choice, following):
+        # 只有可能超过 floor 和已找到的结果时才展开这个分支
+        need = floor if found[0] is None else found[0]
+        if gain + self.remaining[following[:2]] <= need:
+            return
+        rest = self.best(*following, need - gain)
+        if rest is not None:
+            found[0] = gain + rest
+            found[1] = choice
+            found[2] = following
+
+    def _settle(self, value, state, used):
+        # 不够3张的顺子：后面要补的空格比剩下的鬼牌多时无解。
+        # 下一格没有牌的链上，够3张的顺子如果不能用鬼牌接到后面的牌上，就只能结束。
+        # 把这些链的状态清零，不同的状态就能共用同一个结果
+        spare = self.jokers - used
+        need = 0
+        for chain in range(NUM_CHAINS):
+            length = state >> 2 * chain & CHAIN_MASK
+            if not length:
+                continue
+            row = self.status[chain // 2]
+            slot = value + (value + chain) % 2
+            if length != 3:
+                need += (not row[slot]) + (length == 1 and not row[slot + 2])
+            elif not row[slot] and (self.spare_jokers_last or not spare) and not self._bridge(chain, value, spare):
+                state &= ~(CHAIN_MASK << 2 * chain)
+        return state if need <= spare else None
+
+    def _bridge(self, chain, value, spare):
+        # 从 value 起这条链上的空格用鬼牌补上以后，能否接到后面的真牌
+        row = self.status[chain // 2]
+        slot = value + (value + chain) % 2
+        return any(row[slot + 2 * step] for step in range(1, spare + 1))
+
+    def _groups(self, found, value, state, used, group, floor):
+        # 同点的真牌加上鬼牌要凑够3张；超过5张时分成两组
+        for jokers in range(self.jokers - used + 1):
+            if (group or jokers) and (not group or group + jokers < MIN_MELD_SIZE):
+                continue
+            self._try(found, floor, 0, jokers, (value + 1, 0, state, used + jokers, 0))
+
+    def _colors(self, found, value, index, state, used, group, floor):
+        status = self.status[index][value]
+        shift = 2 * _chain(COLORS[index], value)
+        length = state >> shift & CHAIN_MASK
+        cleared = state & ~(CHAIN_MASK << shift)
+        extended = cleared | min(length + 1, 3) << shift
+        gain = min(value, 10) * TILE_SCORE + 1 if status in (OPTIONAL, REQUIRED) else 0
+        spare = self.jokers - used
+        joined = min(group + 1, MIN_MELD_SIZE)
+        nxt = index + 1
+        missing = self.missing[index][value]
+        breaks = length not in (1, 2)  # 顺子不够3张时不能在这里断开
+        # 这个数值上剩下的牌加上鬼牌凑不够3张时，就不可能组成同点组
+        grouping = group + self.later[value][index] + spare >= MIN_MELD_SIZE
+        joker_run = spare and (length or missing < spare)
+        if joker_run and length == 3 and self.spare_jokers_last:
+            joker_run = self._bridge(2 * index + value % 2, value, spare)  # 只是多放一张的鬼牌最后再放
+
+        # 先试得分高的选择，后面的分支更容易被剪掉
+        if status != ABSENT:
+            if length or missing <= spare:
+                self._try(found, floor, gain, RUN_REAL, (value, nxt, extended, used, group))
+            if grouping and breaks:
+                self._try(found, floor, gain, TO_GROUP, (value, nxt, cleared, used, joined))
+            if joker_run and grouping:
+                # 鬼牌接到顺子上，这张牌放进同点组
+                self._try(found, floor, gain, RUN_JOKER | TO_GROUP, (value, nxt, extended, used + 1, joined))
+            if joker_run and status == OPTIONAL:
+                # 鬼牌接到顺子上，这张牌留在手里（桌面上的鬼牌必须用掉时会用到）
+                self._try(found, floor, 0, RUN_JOKER, (value, nxt, extended, used + 1, group))
+        elif joker_run:
+            self._try(found, floor, 0, RUN_JOKER, (value, nxt, extended, used + 1, group))
+        if breaks and status in (ABSENT, OPTIONAL):
+            self._try(found, floor, 0, 0, (value, nxt, cleared, used, group))
+
+    def solve(self):
+        if self.best(VALUES[0], 0, 0, 0, 0, -1) is None:
+            return None
+
+        # 按记下的选择重新走一遍，拼出牌组
+        jokers = self.board_jokers + self.hand_jokers  # 先用掉桌面上的鬼牌
+        melds = []
+        open_runs = [[] for _ in range(NUM_CHAINS)]
+        group = []
+        key = (VALUES[0], 0, self._settle(VALUES[0], 0, 0), 0, 0)
+        while key[0] <= LAST_VALUE:
+            value, index = key[0], key[1]
+            _, _, choice, following = self.memo[key]
+            if index == NUM_COLORS:
+                if group:
+                    melds.extend(_split_group(group, [jokers.pop(0) for _ in range(choice)]))
+                group = []
+            else:
+                color = COLORS[index]
+                chain = _chain(color, value)
+                if choice & RUN_REAL:
+                    open_runs[chain].append(get_tile(color, value))
+                elif choice & RUN_JOKER:
+                    open_runs[chain].append(jokers.pop(0))
+                elif open_runs[chain]:
+                    melds.append(open_runs[chain])
+                    open_runs[chain] = []
+                if choice & TO_GROUP:
+                    group.append(get_tile(color, value))
+            value, index, state, used, count = following
+            if index == 0:
+                state = self._settle(value, state, used)
+            key = (value, index, state, used, count)
+        melds.extend(run for run in open_runs if run)
+        for joker in jokers if self.spare_jokers_last else ():
+            # 剩下的鬼牌放到还有空位的牌组上
+            for meld in melds:
+                if is_valid_combination(meld + [joker]):
+                    meld.append(joker)
+                    break
+            else:
+                # 没有空位时考虑鬼牌的所有放法，重新搜索
+                return _Solver(*self.args, spare_jokers_last=False, deadline=self.deadline).solve()
+
+        played = [card for meld in melds for card in meld
+                  if (card in self.hand_jokers if card.is_joker() else self.status[card.color - 1][card.value] != BOARD)]
+        return Solution(melds, played, sum(card.points for card in played))
+
+
+def _split_group(real, jokers):
+    # 超过5张时分成两组：第二组3张，包括所有鬼牌和至少一张真牌
+    if len(real) + len(jokers) <= MAX_GROUP_SIZE:
+        return [real + jokers]
+    cut = len(real) - (MIN_MELD_SIZE - len(jokers))
+    return [real[:cut], real[cut:] + jokers]
+
+
+def solve(hand, board=(), play_all=False, deadline_ms=None):
+    # hand: 手牌；board: 桌面上所有的牌（不用分组），必须全部用上。
+    # 返回分数最高（同分时出牌最多）的 Solution，桌面的牌无法全部组成牌组时返回 None。
+    # play_all=True 时要求手牌也全部出完。给了 deadline_ms 时超时抛出 robot.SearchTimeout。
+    deadline = None if deadline_ms is None else time.perf_counter() + deadline_ms / 1000
+    return _Solver(hand, board, play_all, deadline=deadline).solve()
+
+
+def can_play_all(hand, board=(), deadline_ms=None):
+    return solve(hand, board, True, deadline_ms) is not None
+
+
+def hint(game, deadline_ms=HINT_DEADLINE_MS):
+    # 给当前玩家的建议：新的整个桌面，没有值得出的牌或者超时时返回 None。
+    # 没破冰时桌面原有的牌组不能动，打出的分数要够破冰。
+    hand = game.players[game.current_player]
+    try:
+        if game.break_ice[game.current_player]:
+            solution = solve(hand, [card for meld in game.board for card in meld], deadline_ms=deadline_ms)
+            if solution is None or not solution.played:
+                return None
+            return solution.melds
+        solution = solve(hand, deadline_ms=deadline_ms)
+    except SearchTimeout:
+        return None
+    if solution.points < OPENING_POINTS:
+        return None
+    return [list(meld) for meld in game.board] + solution.melds
@@ -0,0 +1,73 @@
+# 点击检测用的网格索引：每个格子记录和它相交的矩形，查询一个点只需要看它所在的格子
+
+import pygame
+
+
+class GridIndex():
+    def __init__(self, cell_width, cell_height):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.cells = {}  # (列, 行) -> 这个格子里的键
+        self.rects = {}  # 键 -> 缓存的矩形
+        self.stamps = {}  # 键 -> 最后一次放入的顺序，后放入的在上层
+        self.counter = 0
+
+    def _cells(self, rect):
+        for col in range(rect.left // self.cell_width, (rect.right - 1) // self.cell_width + 1):
+            for row in range(rect.top // self.cell_height, (rect.bottom - 1) // self.cell_height + 1):
+                yield col, row
+
+    def insert(self, key, rect):
+        # 新加入或移动到新位置
+        if key in self.rects:
+            self.remove(key)
+        rect = pygame.Rect(rect)
+        self.rects[key] = rect
+        self.counter += 1
+        self.stamps[key] = self.counter
+        for cell in self._cells(rect):
+            self.cells.setdefault(cell, []).append(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        del self.stamps[key]
+        for cell in self._cells(rect):
+            keys = self.cells[cell]
+            keys.remove(key)
+            if not keys:
+                del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.rects.clear()
+        self.stamps.clear()
+
+    def __contains__(self, key):
+        return key in self.rects
+
+    def top_at(self, point):
+        # 返回包含这个点的最上层的键，没有则返回 None
+        x, y = point
+        best = None
+        for key in self.cells.get((int(x) // self.cell_width, int(y) // self.cell_height), ()):
+            if self.rects[key].collidepoint(point) and (best is None or self.stamps[key] > self.stamps[best]):
+                best = key
+        return best
+
+    def containing(self, rect):
+        # 返回完全包含 rect 的一个键，没有则返回 None
+        rect = pygame.Rect(rect)
+        for key in self.cells.get((rect.left // self.cell_width, rect.top // self.cell_height), ()):
+            if self.rects[key].contains(rect):
+                return key
+        return None
+
+
+def slot_index(slots, cell_width, cell_height):
+    # 牌槽不会移动，用槽的序号作为键；倒序加入，重叠时序号小的槽优先
+    index = GridIndex(cell_width, cell_height)
+    for i in reversed(range(len(slots))):
+        index.insert(i, slots[i])
+    return index
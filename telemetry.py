@@ -0,0 +1,128 @@
+# 运行统计：各阶段的计数和耗时（事件处理、校验、电脑思考、blit 数、帧时间），
+# 以及结构化日志。日志先放在内存里的环形缓冲区，设置了文件时按 JSON 行批量写出，
+# 不在主循环里逐行 print。
+#
+# 级别: off 什么都不记；info 记计数、耗时和一般事件；debug 另外记录拖动等高频事件
+# 游戏里用环境变量打开: RUMMIKUB_TELEMETRY=debug RUMMIKUB_TELEMETRY_LOG=run.jsonl
+
+import json
+import os
+import time
+from collections import deque
+
+OFF = 0
+INFO = 1
+DEBUG = 2
+LEVELS = {'off': OFF, 'info': INFO, 'debug': DEBUG}
+
+WINDOW_SECONDS = 1.0  # 界面上显示的统计每秒更新一次
+CAPACITY = 4096
+
+
+class Telemetry():
+    def __init__(self, level=INFO, capacity=CAPACITY, path=None, echo=False):
+        self.level = level
+        self.records = deque(maxlen=capacity)  # 最近的日志记录
+        self.path = path
+        self.echo = echo  # 同时把 info 事件打印出来
+        self.pending = []  # 还没写进文件的记录
+        self.counters = {}
+        self.timers = {}  # 名称 -> [次数, 总秒数, 最长秒数]，从开始累计
+        self.window = {}  # 当前这一秒的计数和耗时
+        self.last_window = {}  # 上一秒的，用于显示
+        self.window_start = time.perf_counter()
+
+    @staticmethod
+    def from_env(environ=os.environ):
+        level = LEVELS.get(environ.get('RUMMIKUB_TELEMETRY', 'off').lower(), OFF)
+        return Telemetry(level, path=environ.get('RUMMIKUB_TELEMETRY_LOG'))
+
+    def enabled(self, level=INFO):
+        return self.level >= level
+
+    def count(self, name, n=1):
+        if not self.level:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+        window = self.window.get(name)
+        if window is None:
+            self.window[name] = [n, 0.0, 0.0]
+        else:
+            window[0] += n
+
+    def clock(self):
+        # 阶段开始时调用，结束时把返回值交给 add_time
+        return time.perf_counter()
+
+    def add_time(self, name, start):
+        if not self.level:
+            return
+        elapsed = time.perf_counter() - start
+        for stats in (self.timers, self.window):
+            timer = stats.get(name)
+            if timer is None:
+                stats[name] = [1, elapsed, elapsed]
+            else:
+                timer[0] += 1
+                timer[1] += elapsed
+                if elapsed > timer[2]:
+                    timer[2] = elapsed
+
+    def log(self, event, level=INFO, **fields):
+        if self.level < level:
+            return
+        record = {'t': round(time.time(), 3), 'level': 'debug' if level >= DEBUG else 'info', 'event': event}
+        record.update(fields)
+        self.records.append(record)
+        if self.path:
+            self.pending.append(record)
+        if self.echo and level <= INFO:
+            print(event, fields or '')
+
+    def end_frame(self):
+        # 每帧结束时调用：满一秒就切换统计窗口，并把积累的日志写进文件
+        now = time.perf_counter()
+        if now - self.window_start < WINDOW_SECONDS:
+            return False
+        self.last_window = self.window
+        self.last_window['seconds'] = [1, now - self.window_start, 0.0]
+        self.window = {}
+        self.window_start = now
+        self.flush()
+        return True
+
+    def flush(self):
+        if not self.pending:
+            return
+        with open(self.path, 'a') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in self.pending))
+        self.pending = []
+
+    def overlay_lines(self):
+        # 上一秒的统计，每项一行，给界面上的统计层使用
+        window = self.last_window
+        if not window:
+            return []
+        seconds = window['seconds'][1]
+        frames = window.get('frame', [0, 0.0, 0.0])
+        lines = [f"FPS {frames[0] / seconds:.0f}"]
+        for name in ('frame', 'events', 'validate', 'draw', 'robot'):
+            stats = window.get(name)
+            if stats and stats[0]:
+                lines.append(f"{name} {stats[1] / stats[0] * 1000:.1f}/{stats[2] * 1000:.1f} ms")
+        if frames[0] and 'blits' in window:
+            lines.append(f"blits {window['blits'][0] / frames[0]:.0f}/frame")
+        return lines
+
+    def summary(self):
+        return {
+            'counters': dict(self.counters),
+            'timers': {name: {'count': count, 'total_ms': total * 1000, 'max_ms': longest * 1000}
+                       for name, (count, total, longest) in self.timers.items()},
+        }
+
+    def close(self):
+        if self.level:
+            self.log('summary', **self.summary())
+        if self.path:
+            self.flush()
@@ -0,0 +1,98 @@
+# 桌面模型和一行牌的切分：python -m pytest test_board.py
+
+import random
+
+import rules
+from board import Board
+from robot import mask_tiles
+from test_solver import JOKERS, brute_is_meld
+from tiles import TILES, get_tile
+
+ALL_MELDS = sorted(rules.MELDS)
+
+
+def brute_partitions(cards):
+    # 枚举所有切分位置，返回每段都是有效牌组的切分方法
+    if not cards:
+        return [[]]
+    found = []
+    for end in range(rules.MIN_MELD_SIZE, len(cards) + 1):
+        if brute_is_meld(cards[:end]):
+            found.extend([cards[:end]] + rest for rest in brute_partitions(cards[end:]))
+    return found
+
+
+def random_row(rng):
+    # 由几组有效牌组拼成，有一半的机会再插入、删掉或换掉一张牌
+    cards = []
+    for _ in range(rng.randrange(1, 4)):
+        meld = mask_tiles(rng.choice(ALL_MELDS))
+        rng.shuffle(meld)
+        if not set(meld) & set(cards):
+            cards += meld
+    kind = rng.randrange(6)
+    if kind == 0:
+        cards.insert(rng.randrange(len(cards) + 1), rng.choice(TILES))
+    elif kind == 1:
+        del cards[rng.randrange(len(cards))]
+    elif kind == 2:
+        cards[rng.randrange(len(cards))] = rng.choice(TILES)
+    if len(set(cards)) != len(cards):
+        return random_row(rng)
+    return cards[:12]
+
+
+def test_partition_row_matches_brute_force():
+    rng = random.Random(2)
+    for _ in range(3000):
+        cards = random_row(rng)
+        melds, invalid = rules.partition_row(cards)
+        expected = brute_partitions(cards)
+        assert (melds is not None) == bool(expected), cards
+        if melds is None:
+            assert invalid and all(card in cards for card in invalid)
+        else:
+            assert invalid == []
+            assert [card for meld in melds for card in meld] == cards
+            assert all(brute_is_meld(meld) for meld in melds)
+
+
+def rescan(board):
+    # 不用增量结果，逐行找出连续的段重新切分
+    invalid_slots = []
+    melds = []
+    for row_start in range(0, board.rows * board.cols, board.cols):
+        slot = row_start
+        while slot < row_start + board.cols:
+            if board.tile_at(slot) is None:
+                slot += 1
+                continue
+            start = slot
+            while slot < row_start + board.cols and board.tile_at(slot) is not None:
+                slot += 1
+            segment_melds, _ = rules.partition_row([board.tile_at(s) for s in range(start, slot)])
+            if segment_melds is None:
+                invalid_slots.extend(range(start, slot))
+            else:
+                melds.extend(segment_melds)
+    return invalid_slots, melds
+
+
+def test_incremental_validity_matches_rescan():
+    rng = random.Random(4)
+    # 牌的种类少一些，桌面上才会经常出现有效的牌组
+    pool = [get_tile(color, value) for color in (1, 2) for value in range(1, 8)] + JOKERS
+    for _ in range(20):
+        board = Board(rows=3, cols=8)
+        for _ in range(300):
+            tile = rng.choice(pool)
+            if tile in board and rng.random() < 0.3:
+                board.remove(tile)
+            else:
+                board.place(tile, rng.randrange(board.rows * board.cols))
+            invalid_slots, melds = rescan(board)
+            assert sorted(board.invalid_slots()) == invalid_slots
+            assert board.melds() == melds
+            assert board.is_valid() == (not invalid_slots)
+            assert len(board) == len(board.tiles())
+            assert all(board.tile_at(board.slot_of(card)) is card for card in board.tiles())
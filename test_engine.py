@@ -0,0 +1,59 @@
+# 规则引擎的回合流程：python -m pytest test_engine.py
+
+from engine import RummikubEngine
+from tiles import get_tile
+
+
+def opened_game(seed=0):
+    # 当前玩家已经破冰，桌面上有一组牌
+    game = RummikubEngine(seed=seed)
+    game.start_game()
+    game.break_ice[0] = True
+    game.board = [[get_tile(1, 1), get_tile(1, 3), get_tile(1, 5)]]
+    for meld in game.board:
+        for card in meld:
+            for hand in game.players:
+                if card in hand:
+                    hand.remove(card)
+            if card in game.public_pouch.tiles:
+                game.public_pouch.tiles.remove(card)
+    return game
+
+
+def test_rearrange_unchanged_board_is_not_a_play():
+    game = opened_game()
+    hand_size = len(game.players[0])
+    pouch = len(game.public_pouch)
+    assert not game.rearrange([list(meld) for meld in game.board])
+    game.end_turn()
+    assert len(game.players[0]) == hand_size + 1
+    assert len(game.public_pouch) == pouch - 1
+    assert game.passes == 0
+
+
+def test_unchanged_board_every_turn_blocks_the_game():
+    # 牌堆摸完以后只交回原来的桌面，一整轮之后牌局结束
+    game = opened_game()
+    game.public_pouch.tiles.clear()
+    for _ in range(game.num_players):
+        game.rearrange([list(meld) for meld in game.board])
+        game.end_turn()
+    assert game.is_over()
+
+
+def test_rearrange_after_a_play_in_the_same_turn():
+    game = opened_game()
+    card = get_tile(1, 7)
+    for hand in game.players[1:]:
+        if card in hand:
+            hand.remove(card)
+    if card in game.public_pouch.tiles:
+        game.public_pouch.tiles.remove(card)
+    if card not in game.players[0]:
+        game.players[0].append(card)
+    hand_size = len(game.players[0])
+    assert game.extend_meld(0, [card])
+    # 同一回合里只是调整桌面，仍然算这回合出过牌
+    assert game.rearrange([list(meld) for meld in game.board])
+    game.end_turn()
+    assert len(game.players[0]) == hand_size - 1
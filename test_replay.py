@@ -0,0 +1,50 @@
+# 对局记录回放：python -m pytest test_replay.py
+
+import selfplay
+from replay import replay
+from snapshot import snapshot
+from tiles import NUM_TILES
+
+
+def play_logged_game(tmp_path, seed):
+    # 和 selfplay 的工作进程一样初始化，日志写到临时目录
+    selfplay._init_worker(['search', 'greedy', 'search'], 5, str(tmp_path))
+    try:
+        result = selfplay.play_game(seed)
+    finally:
+        selfplay._seats = selfplay._log_dir = None
+    return result, tmp_path / f'game_{seed}.rklog'
+
+
+def test_selfplay_log_replays_to_the_same_result(tmp_path):
+    for seed in range(3):
+        result, path = play_logged_game(tmp_path, seed)
+        game = replay(path)
+        assert game.final_winner() == result['winner']
+        assert (game.winner is not None) == result['went_out']
+        assert game.scores() == result['scores']
+        assert len(game.public_pouch) == result['pouch_left']
+        assert [game.hand_points(i) for i in range(game.num_players)] == result['points_left']
+
+
+def test_replay_is_deterministic(tmp_path):
+    _, path = play_logged_game(tmp_path, 7)
+    first = replay(path)
+    second = replay(path)
+    assert snapshot(first) == snapshot(second)
+    assert first.rng.getstate() == second.rng.getstate()
+
+
+def test_truncated_log_replays_the_complete_turns(tmp_path):
+    _, path = play_logged_game(tmp_path, 11)
+    data = path.read_bytes()
+    full = replay(path)
+    cut = tmp_path / 'cut.rklog'
+    for size in (len(data) // 3, len(data) // 2, len(data) - 1):
+        cut.write_bytes(data[:size])
+        game = replay(cut)
+        # 半截记录被丢掉，回放停在某个回合的中间或结尾，不会超过完整对局
+        assert game.round <= full.round
+        cards = [card for hand in game.players for card in hand] + list(game.public_pouch.tiles)
+        cards += [card for meld in game.board for card in meld]
+        assert sorted(card.id for card in cards) == list(range(NUM_TILES))
@@ -0,0 +1,69 @@
+# 对局快照的往返：python -m pytest test_snapshot.py
+
+import pytest
+
+import snapshot
+from engine import RummikubEngine
+from robot import GreedyRobot
+
+
+def game_state(game):
+    # 复制成元组，之后对局继续进行也不会改变结果
+    return (game.num_players, game.current_player, game.round, game.passes, game.winner,
+            tuple(game.break_ice), tuple(map(tuple, game.players)), tuple(game.public_pouch.tiles),
+            tuple(map(tuple, game.board)), game.seed)
+
+
+def mid_game(seed, turns):
+    game = RummikubEngine(num_players=3, seed=seed)
+    game.start_game()
+    play_on(game, turns)
+    return game
+
+
+def play_on(game, turns):
+    # 接着下几个回合，返回之后的状态
+    robot = GreedyRobot()
+    for _ in range(turns):
+        if game.is_over():
+            break
+        robot.play_turn(game)
+    return game_state(game)
+
+
+def test_snapshot_restore_round_trip():
+    for seed in range(5):
+        game = mid_game(seed, 10 + seed * 7)
+        data = snapshot.snapshot(game)
+        assert len(data) == snapshot.SNAPSHOT_SIZE
+        restored = snapshot.restore(data)
+        assert game_state(restored) == game_state(game)
+        assert snapshot.snapshot(restored) == data
+
+
+def test_fork_is_independent_and_draws_the_same_tiles():
+    game = mid_game(3, 12)
+    before = game_state(game)
+    copy = snapshot.fork(game)
+    assert play_on(copy, 20) != before
+    assert game_state(game) == before
+    assert play_on(game, 20) == game_state(copy)
+
+
+def test_save_load_keeps_the_random_state(tmp_path):
+    game = mid_game(8, 15)
+    path = tmp_path / 'game.rkss'
+    snapshot.save(game, path)
+    loaded = snapshot.load(path)
+    assert game_state(loaded) == game_state(game)
+    assert loaded.rng.getstate() == game.rng.getstate()
+    assert play_on(loaded, 20) == play_on(game, 20)
+
+
+def test_snapshot_rejects_a_turn_in_progress():
+    game = mid_game(1, 4)
+    game.begin_change()
+    with pytest.raises(ValueError):
+        snapshot.snapshot(game)
+    with pytest.raises(ValueError):
+        snapshot.restore(b'XXXX' + bytes(snapshot.SNAPSHOT_SIZE - 4))
@@ -0,0 +1,103 @@
+# 用暴力方法检查牌组表和精确求解器：python -m pytest test_solver.py
+
+import random
+
+import solver
+from robot import SearchRobot, tiles_mask
+from rules import MAX_GROUP_SIZE, MAX_MELD_SIZE, MIN_MELD_SIZE, is_valid_combination
+from tiles import COLORS, TILES, VALUES, get_tile
+
+REAL_TILES = [card for card in TILES if not card.is_joker()]
+JOKERS = [card for card in TILES if card.is_joker()]
+
+
+def brute_is_meld(cards):
+    # 直接按规则定义判断，不用查表
+    real = [card for card in cards if not card.is_joker()]
+    if len(cards) < MIN_MELD_SIZE or not real:
+        return False
+    if len(set(card.value for card in real)) == 1:
+        return len(cards) <= MAX_GROUP_SIZE and len(set(card.color for card in real)) == len(real)
+    values = sorted(card.value for card in real)
+    if len(set(card.color for card in real)) != 1 or len(set(values)) != len(values):
+        return False
+    if len(set(value % 2 for value in values)) != 1 or len(cards) > MAX_MELD_SIZE:
+        return False
+    # 找一个同奇偶、每次加2、长度为 len(cards) 且不超出 1..15 的位置放下所有真牌
+    first = VALUES[0] + (values[0] - VALUES[0]) % 2
+    start = max(first, values[-1] - 2 * (len(cards) - 1))
+    return start <= values[0] and start + 2 * (len(cards) - 1) <= VALUES[-1]
+
+
+def random_meld_candidate(rng):
+    # 大部分候选只用一种颜色或一个数值，这样有效和无效的都不少
+    size = rng.randrange(MIN_MELD_SIZE, MAX_MELD_SIZE + 2)
+    kind = rng.random()
+    if kind < 0.4:
+        color = rng.choice(COLORS)
+        pool = [get_tile(color, value) for value in VALUES]
+    elif kind < 0.8:
+        value = rng.choice(VALUES)
+        pool = [get_tile(color, value) for color in COLORS]
+    else:
+        pool = REAL_TILES
+    cards = rng.sample(pool, min(size, len(pool)))
+    jokers = rng.choice((0, 0, 1, 2))
+    cards[:jokers] = JOKERS[:jokers]
+    return cards
+
+
+def test_meld_table_matches_definition():
+    rng = random.Random(1)
+    for _ in range(5000):
+        cards = random_meld_candidate(rng)
+        assert is_valid_combination(cards) == brute_is_meld(cards), cards
+
+
+def random_position(rng, jokers):
+    # 桌面是一部分牌的最佳出法，剩下的是手牌
+    pool = rng.sample(REAL_TILES, rng.randrange(5, 13)) + rng.sample(JOKERS, jokers)
+    rng.shuffle(pool)
+    first = solver.solve(pool[:rng.randrange(len(pool))])
+    board = [card for meld in first.melds for card in meld]
+    hand = [card for card in pool if card not in board]
+    return hand, board
+
+
+def test_solve_matches_search_robot():
+    rng = random.Random(7)
+    robot = SearchRobot(deadline_ms=60000, table_size=10 ** 6)
+    for trial in range(200):
+        hand, board = random_position(rng, trial % 3)
+        solution = solver.solve(hand, board)
+        robot.table.clear()
+        best = robot.search(tiles_mask(board), tiles_mask(hand))
+        assert (solution is None) == (best is None)
+        if solution is None:
+            continue
+        used = [card for meld in solution.melds for card in meld]
+        assert all(is_valid_combination(meld) for meld in solution.melds)
+        assert len(used) == len(set(used)) and set(board) <= set(used)
+        assert set(solution.played) == set(used) - set(board) <= set(hand)
+        assert solution.points == sum(card.points for card in solution.played)
+        assert solution.points * solver.TILE_SCORE + len(solution.played) == best[0], (hand, board)
+
+
+def test_spare_jokers_placed_last_matches_full_search():
+    rng = random.Random(5)
+    for trial in range(300):
+        hand, board = random_position(rng, 1 + trial % 2)
+        for play_all in (False, True):
+            fast = solver._Solver(hand, board, play_all).solve()
+            full = solver._Solver(hand, board, play_all, spare_jokers_last=False).solve()
+            assert (fast is None) == (full is None)
+            if fast is not None:
+                assert (fast.points, len(fast.played)) == (full.points, len(full.played))
+
+
+def test_can_play_all():
+    rng = random.Random(3)
+    for _ in range(200):
+        hand = rng.sample(TILES, rng.randrange(3, 12))
+        solution = solver.solve(hand)
+        assert solver.can_play_all(hand) == (len(solution.played) == len(hand))
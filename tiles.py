@@ -0,0 +1,58 @@
+# 77张牌的整数编号和共享实例，不依赖 pygame
+
+COLORS = range(1, 6)  # 5种颜色
+VALUES = range(1, 16)  # 每种颜色15张牌
+JOKER_COLORS = ['black', 'red']
+NUM_TILES = len(COLORS) * len(VALUES) + len(JOKER_COLORS)  # 77张牌
+JOKER_IDS = (NUM_TILES - 2, NUM_TILES - 1)
+VALUE_NAMES = {10: "0a", 11: "0b", 12: "0c", 13: "0d", 14: '0e', 15: '0f'}
+
+
+class Tile():
+    # 每张牌只有一个共享的实例，用 0..76 的整数编号：
+    # 编号 = (颜色 - 1) * 15 + (数值 - 1)，75 和 76 是黑、红两张鬼牌。
+    # 牌的位置不放在牌上，由界面单独用数组按编号保存。
+    __slots__ = ('id', 'color', 'value', 'points', 'image_key')
+
+    def __init__(self, tile_id):
+        self.id = tile_id
+        joker_index = tile_id - len(COLORS) * len(VALUES)
+        if joker_index >= 0:
+            self.color = JOKER_COLORS[joker_index]
+            self.value = 0
+            self.points = 0
+            self.image_key = f'pics/{self.color}.png'
+        else:
+            self.color = tile_id // len(VALUES) + 1
+            self.value = tile_id % len(VALUES) + 1
+            self.points = self.value if self.value <= 9 else 10
+            self.image_key = f'pics/{self.color}-{VALUE_NAMES.get(self.value, str(self.value).zfill(2))}.png'
+
+    def is_joker(self):
+        return self.value == 0
+
+    def __repr__(self):
+        if self.is_joker():
+            return f'Tile({self.color} joker)'
+        return f'Tile({self.color}-{self.value})'
+
+    def __reduce__(self):
+        # 序列化时只保存编号，反序列化后仍指向同一个实例
+        return tile_from_id, (self.id,)
+
+
+TILES = tuple(Tile(i) for i in range(NUM_TILES))
+
+
+def tile_from_id(tile_id):
+    return TILES[tile_id]
+
+
+def tile_id(color, value):
+    if color in JOKER_COLORS:
+        return len(COLORS) * len(VALUES) + JOKER_COLORS.index(color)
+    return (color - 1) * len(VALUES) + (value - 1)
+
+
+def get_tile(color, value=0):
+    return TILES[tile_id(color, value)]